@@ -0,0 +1,14 @@
+-- drop rows repeated by earlier re-ingestion, keeping the first of each
+DELETE s2 FROM stimulations s1
+JOIN stimulations s2
+  ON s2.well_id = s1.well_id
+ AND s2.date_stimulated <=> s1.date_stimulated
+ AND s2.stimulated_formation <=> s1.stimulated_formation
+ AND s2.top_ft <=> s1.top_ft
+ AND s2.bottom_ft <=> s1.bottom_ft
+ AND s2.id > s1.id;
+
+-- natural key of a stimulation row; NULL parts are not unique to MySQL, so
+-- the writer (sinks.py) also diffs by this key before writing
+ALTER TABLE stimulations
+ADD UNIQUE INDEX stimulation_key (well_id, date_stimulated, stimulated_formation, top_ft, bottom_ft);
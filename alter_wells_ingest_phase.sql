@@ -0,0 +1,5 @@
+ALTER TABLE wells
+ADD COLUMN ingest_phase VARCHAR(16) NOT NULL DEFAULT 'complete';
+
+ALTER TABLE wells
+ADD INDEX (ingest_phase);
@@ -1,17 +1,23 @@
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
-import os
+from werkzeug.utils import secure_filename
 import pymysql.cursors
 import datetime
+import hashlib
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from db_settings import db_config
+from ocr_config import ocr_config
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 CORS(app)
 
 db_conf = {
-    "host": os.environ.get("DB_HOST", "localhost"),
-    "user": os.environ.get("DB_USER", "root"),
-    "password": os.environ.get("DB_PASS", "admin123"),
-    "db": os.environ.get("DB_NAME", "oil_wells"),
+    **db_config,
     "cursorclass": pymysql.cursors.DictCursor,
     "charset": "utf8mb4"
 }
@@ -74,6 +80,191 @@ def api_well(wid):
         except:
             pass
 
+@app.route('/api/wells/<int:wid>/trajectory')
+def api_well_trajectory(wid):
+    try:
+        conn = get_conn()
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, latitude, longitude FROM wells WHERE id=%s", (wid,))
+            w = cur.fetchone()
+            if not w:
+                return jsonify({}), 404
+            cur.execute(
+                "SELECT md, inclination, azimuth, tvd, northing, easting, dogleg, latitude, longitude FROM surveys WHERE well_id=%s ORDER BY md",
+                (wid,)
+            )
+            stations = cur.fetchall()
+        return jsonify({
+            "well_id": wid,
+            "surface": {"latitude": w['latitude'], "longitude": w['longitude']},
+            "stations": stations,
+            "bottom_hole": stations[-1] if stations else None
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        try:
+            conn.close()
+        except:
+            pass
+
+# uploaded files are kept in pdfs/ like the batch input, so --repair and
+# later batch runs find them
+pdf_folder = "pdfs"
+ingest_jobs = {}
+ingest_lock = threading.Lock()
+ingest_pool = None
+
+def _ingest_pool():
+    global ingest_pool
+    with ingest_lock:
+        if ingest_pool is None:
+            ingest_pool = ThreadPoolExecutor(max_workers=ocr_config["uploads"]["workers"], thread_name_prefix="ingest")
+        return ingest_pool
+
+def _update_job(job_id, **fields):
+    with ingest_lock:
+        job = ingest_jobs.get(job_id)
+        if job is not None:
+            job.update(fields, updated=time.time())
+
+def _forget_old_jobs():
+    # called with ingest_lock held
+    finished = [j for j in ingest_jobs.values() if j["status"] in ("done", "rejected", "failed", "duplicate")]
+    for job in sorted(finished, key=lambda j: j["updated"])[:max(0, len(ingest_jobs) - ocr_config["uploads"]["keep_jobs"])]:
+        del ingest_jobs[job["id"]]
+
+def _save_upload(stream):
+    # copies the upload to a temp file in pdfs/ in 1 MB chunks, hashing as it
+    # goes; returns (temp path, sha256) or raises ValueError(message, status)
+    os.makedirs(pdf_folder, exist_ok=True)
+    limit = ocr_config["uploads"]["max_mb"] * 1024 * 1024
+    tmp = os.path.join(pdf_folder, f".upload-{uuid.uuid4().hex}.part")
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp, "wb") as out:
+            while chunk := stream.read(1024 * 1024):
+                if size == 0 and not chunk.startswith(b"%PDF"):
+                    raise ValueError("not a PDF file", 400)
+                size += len(chunk)
+                if size > limit:
+                    raise ValueError(f"file is over {ocr_config['uploads']['max_mb']} MB", 413)
+                hasher.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise ValueError("empty upload", 400)
+    except Exception:
+        os.remove(tmp)
+        raise
+    return tmp, hasher.hexdigest()
+
+def _place_upload(tmp, filename, file_hash):
+    # moves the temp file to its name in pdfs/; a different file already
+    # using the name gets the hash as a prefix
+    name = secure_filename(filename or "") or f"{file_hash[:12]}.pdf"
+    if not name.lower().endswith(".pdf"):
+        name += ".pdf"
+    path = os.path.join(pdf_folder, name)
+    if os.path.exists(path):
+        path = os.path.join(pdf_folder, f"{file_hash[:12]}_{name}")
+    if os.path.exists(path):
+        os.remove(tmp)
+    else:
+        os.replace(tmp, path)
+    return path
+
+def _well_by_hash(file_hash):
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, qc_status, ingest_phase FROM wells WHERE file_hash=%s", (file_hash,))
+            return cur.fetchone()
+    finally:
+        conn.close()
+
+def _run_ingest(job_id, path, file_hash):
+    # runs on an ingest pool thread; OCR itself goes to the ocr_workers pool
+    import ocr_and_extract
+    ocr_and_extract.use_thread_sink()
+    _update_job(job_id, status="running", phase="ocr", started=time.time())
+
+    def progress(event, **info):
+        if event in ("ocr", "background"):
+            _update_job(job_id, phase=event, pages_done=info["page"], pages_total=info["pages"])
+        elif event == "stored":
+            _update_job(job_id, status="stored" if info["background"] else "done",
+                        phase="background" if info["background"] else "complete",
+                        well_id=info["well_id"], qc_status=info["qc_status"])
+        elif event == "complete":
+            _update_job(job_id, status="done", phase="complete")
+        else:
+            _update_job(job_id, status=event, error=info.get("error"), qc_status=info.get("qc_status"))
+
+    try:
+        if not ocr_and_extract.process_file(path, file_hash, progress):
+            _update_job(job_id, status="duplicate")
+    except Exception as e:
+        _update_job(job_id, status="failed", error=str(e))
+
+@app.route('/api/ingest', methods=['POST'])
+def api_ingest():
+    # multipart form field "file", or the raw PDF as the request body with
+    # ?filename=; the raw body is written to disk without being buffered first
+    upload = request.files.get("file")
+    if upload is not None:
+        stream, filename = upload.stream, upload.filename
+    else:
+        stream, filename = request.stream, request.args.get("filename", "")
+    try:
+        tmp, file_hash = _save_upload(stream)
+    except ValueError as e:
+        message, status = e.args
+        return jsonify({"error": message}), status
+
+    try:
+        well = _well_by_hash(file_hash)
+    except Exception as e:
+        os.remove(tmp)
+        return jsonify({"error": str(e)}), 500
+    if well:
+        os.remove(tmp)
+        return jsonify({"status": "duplicate", "file_hash": file_hash, "well_id": well["id"],
+                        "qc_status": well["qc_status"], "phase": well["ingest_phase"]}), 200
+
+    job = {
+        "id": uuid.uuid4().hex[:16], "status": "queued", "phase": None, "filename": None,
+        "file_hash": file_hash, "pages_done": 0, "pages_total": None, "well_id": None,
+        "qc_status": None, "error": None, "created": time.time(), "updated": time.time(),
+    }
+    # the same file uploaded twice while the first is still being read
+    # gets the first upload's job
+    with ingest_lock:
+        running = next((j for j in ingest_jobs.values()
+                        if j["file_hash"] == file_hash and j["status"] in ("queued", "running", "stored")), None)
+        if running is None:
+            _forget_old_jobs()
+            ingest_jobs[job["id"]] = job
+        else:
+            running = dict(running)
+    if running is not None:
+        os.remove(tmp)
+        return jsonify({**running, "url": f"/api/ingest/{running['id']}"}), 200
+
+    path = _place_upload(tmp, filename, file_hash)
+    _update_job(job["id"], filename=os.path.basename(path))
+    _ingest_pool().submit(_run_ingest, job["id"], path, file_hash)
+    return jsonify({**job, "filename": os.path.basename(path), "url": f"/api/ingest/{job['id']}"}), 202
+
+@app.route('/api/ingest/<job_id>')
+def api_ingest_job(job_id):
+    with ingest_lock:
+        job = ingest_jobs.get(job_id)
+        job = dict(job) if job is not None else None
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return jsonify(job)
+
 @app.route('/')
 def index():
     return send_from_directory('templates', 'index.html')
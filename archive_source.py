@@ -0,0 +1,256 @@
+# archive_source.py
+# Reads PDFs straight out of ZIP/TAR bundles instead of unpacking them into
+# pdfs/. Each member is hashed while it is copied to its own temp file (the
+# renderers need a path). At most max_pending members wait for or are in
+# phase 1, and all temp copies on disk, including those kept for a two-phase
+# background pass, stay within max_held files and max_held_mb.
+import hashlib
+import os
+import queue
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from typing import Iterator, List, Optional, Tuple
+
+from ocr_config import ocr_config
+
+archive_suffixes = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+chunk_size = 1024 * 1024
+
+def is_archive(path: str) -> bool:
+    return path.lower().endswith(archive_suffixes)
+
+def _is_pdf(name: str) -> bool:
+    base = os.path.basename(name)
+    return base.lower().endswith(".pdf") and not base.startswith(".")
+
+def list_members(path: str) -> List[Tuple[str, int]]:
+    # (name, uncompressed size) of the PDF members; cheap for a ZIP (central
+    # directory), but a tar.gz has no index and is read in full
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            return [(i.filename, i.file_size) for i in zf.infolist() if not i.is_dir() and _is_pdf(i.filename)]
+    with tarfile.open(path, "r|*") as tf:
+        return [(m.name, m.size) for m in tf if m.isfile() and _is_pdf(m.name)]
+
+class _CountingReader:
+    # how far into the archive file a streaming tar read has got
+    def __init__(self, f):
+        self.f = f
+        self.position = 0
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.position += len(data)
+        return data
+
+def _open_members(path: str, counter: Optional[_CountingReader] = None):
+    # yields (name, size, readable file) in archive order without seeking,
+    # so compressed tars are read in a single pass; a tar is read through
+    # counter when one is given
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and _is_pdf(info.filename):
+                    with zf.open(info) as f:
+                        yield info.filename, info.file_size, f
+    else:
+        with open(path, "rb") as raw:
+            if counter is not None:
+                counter.f = raw
+            with tarfile.open(fileobj=counter or raw, mode="r|*") as tf:
+                for m in tf:
+                    if m.isfile() and _is_pdf(m.name):
+                        yield m.name, m.size, tf.extractfile(m)
+
+# temp path -> (refcount, temp dir, bytes); a two-phase well keeps its member
+# on disk until the background pass is done with it
+_held = {}
+_held_changed = threading.Condition()
+
+def hold(path: str):
+    with _held_changed:
+        if path in _held:
+            count, tmp, size = _held[path]
+            _held[path] = (count + 1, tmp, size)
+
+def release(path: str):
+    with _held_changed:
+        if path not in _held:
+            return
+        count, tmp, size = _held.pop(path)
+        if count > 1:
+            _held[path] = (count - 1, tmp, size)
+            return
+    shutil.rmtree(tmp, ignore_errors=True)
+    with _held_changed:
+        _held_changed.notify_all()
+
+def _wait_for_disk(size: int, stop: threading.Event):
+    # blocks until a copy of size bytes fits beside the temp copies already
+    # on disk; a member is always let in when nothing else is held
+    cfg = ocr_config["archives"]
+    max_files = cfg["max_held"]
+    max_bytes = cfg["max_held_mb"] * 2**20
+    with _held_changed:
+        while _held and not stop.is_set():
+            used = sum(held_size for _, _, held_size in _held.values())
+            if (not max_files or len(_held) < max_files) and (not max_bytes or used + size <= max_bytes):
+                return
+            _held_changed.wait(1)
+
+class ArchiveProgress:
+    # a ZIP's members and sizes are known up front; a tar is not listed
+    # first (that would decompress it twice), so its progress is how far
+    # into the archive file each member ended, and its member count is set
+    # once the reader reaches the end
+    def __init__(self, path: str, members: Optional[int], total_bytes: int, streamed: bool = False):
+        self.name = os.path.basename(path)
+        self.members = members
+        self.total_bytes = total_bytes
+        self.streamed = streamed
+        self.lock = threading.Lock()
+        self.done = 0
+        self.skipped = 0
+        self.done_bytes = 0
+        self.start = time.monotonic()
+
+    def counted(self, members: int):
+        with self.lock:
+            self.members = members
+
+    def finished(self, size: int, skipped: bool = False, position: Optional[int] = None):
+        with self.lock:
+            self.done += 1
+            self.skipped += skipped
+            if self.streamed:
+                self.done_bytes = max(self.done_bytes, position or 0)
+            else:
+                self.done_bytes += size
+            elapsed = time.monotonic() - self.start
+            rate = self.done_bytes / elapsed if elapsed else 0
+            eta = (self.total_bytes - self.done_bytes) / rate if rate else 0
+            left = self.members is None or self.done < self.members
+            print(f"{self.name}: {self.done}" + (f"/{self.members}" if self.members is not None else "") + " members"
+                  + (f" ({self.skipped} skipped)" if self.skipped else "")
+                  + f", {self.done_bytes / 2**20:.0f}/{self.total_bytes / 2**20:.0f} MB"
+                  + (" read" if self.streamed else "")
+                  + (f", about {eta / 60:.0f} min left" if left else f" in {elapsed / 60:.1f} min"))
+
+class Member:
+    def __init__(self, archive: str, name: str, size: int, path: Optional[str], file_hash: Optional[str],
+                 progress: ArchiveProgress, slot: Optional[threading.BoundedSemaphore] = None,
+                 position: Optional[int] = None):
+        self.archive = archive
+        self.name = name
+        self.size = size
+        self.path = path
+        self.file_hash = file_hash
+        self.progress = progress
+        self.slot = slot
+        # bytes of a tar read when this member was copied
+        self.position = position
+
+    def done(self, skipped: bool = False):
+        # called once by whoever consumed the member, when phase 1 is over:
+        # the reader may copy the next member, and the temp copy goes when
+        # no background pass holds it any more
+        if self.path:
+            release(self.path)
+        if self.slot is not None:
+            self.slot.release()
+            self.slot = None
+        self.progress.finished(self.size, skipped or self.path is None, self.position)
+
+def _copy_member(f, name: str, tmp_root: Optional[str], max_bytes: int) -> Tuple[Optional[str], Optional[str], str]:
+    # returns (temp path, sha256, temp dir); the temp file keeps the member's
+    # base name so the stored filename matches an unpacked copy
+    tmp = tempfile.mkdtemp(prefix="member_", dir=tmp_root)
+    path = os.path.join(tmp, os.path.basename(name))
+    hasher = hashlib.sha256()
+    written = 0
+    with open(path, "wb") as out:
+        while chunk := f.read(chunk_size):
+            written += len(chunk)
+            if max_bytes and written > max_bytes:
+                return None, None, tmp
+            hasher.update(chunk)
+            out.write(chunk)
+    return path, hasher.hexdigest(), tmp
+
+def stream_members(path: str) -> Iterator[Member]:
+    # a reader thread copies members ahead of the consumer; the slot
+    # semaphore blocks it while max_pending members are not through phase 1,
+    # and _wait_for_disk while the temp copies on disk are at their limit
+    cfg = ocr_config["archives"]
+    tmp_root = cfg["tmp_dir"] or None
+    if tmp_root:
+        os.makedirs(tmp_root, exist_ok=True)
+    max_bytes = cfg["max_member_mb"] * 2**20
+    counter = None
+    if zipfile.is_zipfile(path):
+        members = list_members(path)
+        progress = ArchiveProgress(path, len(members), sum(size for _, size in members))
+        print(f"\n{progress.name}: {len(members)} PDF members, {progress.total_bytes / 2**20:.0f} MB")
+    else:
+        counter = _CountingReader(None)
+        progress = ArchiveProgress(path, None, os.path.getsize(path), streamed=True)
+        print(f"\n{progress.name}: {progress.total_bytes / 2**20:.0f} MB archive, members counted as they are read")
+    slot = threading.BoundedSemaphore(max(1, cfg["max_pending"]))
+    out = queue.Queue()
+    stop = threading.Event()
+    end = object()
+
+    def reader():
+        count = 0
+        try:
+            for name, size, f in _open_members(path, counter):
+                count += 1
+                slot.acquire()
+                _wait_for_disk(size, stop)
+                if stop.is_set():
+                    slot.release()
+                    break
+                member_path, file_hash, tmp = _copy_member(f, name, tmp_root, max_bytes)
+                if member_path is None:
+                    print(f"{progress.name}: {name} is over max_member_mb, skipped")
+                    shutil.rmtree(tmp, ignore_errors=True)
+                    slot.release()
+                    out.put(Member(path, name, size, None, None, progress, position=counter and counter.position))
+                    continue
+                with _held_changed:
+                    _held[member_path] = (1, tmp, os.path.getsize(member_path))
+                out.put(Member(path, name, size, member_path, file_hash, progress, slot,
+                               counter and counter.position))
+            else:
+                if counter is not None:
+                    progress.counted(count)
+        except Exception as e:
+            print(f"{progress.name}: read error: {e}")
+        finally:
+            out.put(end)
+
+    thread = threading.Thread(target=reader, name=f"archive-{progress.name}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            member = out.get()
+            if member is end:
+                break
+            yield member
+    finally:
+        stop.set()
+        # unblock the reader if the consumer stopped early
+        while thread.is_alive():
+            try:
+                member = out.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if member is not end:
+                if member.path:
+                    release(member.path)
+                if member.slot is not None:
+                    member.slot.release()
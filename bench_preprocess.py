@@ -0,0 +1,59 @@
+# bench_preprocess.py
+import os
+import sys
+import time
+
+import pytesseract
+
+from ocr_config import ocr_config
+from page_images import load_page_images
+from image_prep import preprocess_page
+
+pdf_folder = "pdfs"
+pages_per_file = int(os.environ.get("BENCH_PAGES", "5"))
+
+def ocr_stats(img):
+    start = time.perf_counter()
+    data = pytesseract.image_to_data(img, config="--psm 6", output_type=pytesseract.Output.DICT)
+    elapsed = time.perf_counter() - start
+    confs = [float(c) for c, t in zip(data["conf"], data["text"]) if float(c) >= 0 and t.strip()]
+    return elapsed, len(confs), sum(confs) / len(confs) if confs else 0.0
+
+def sample_pages():
+    for f in sorted(os.listdir(pdf_folder)):
+        if not f.lower().endswith(".pdf"):
+            continue
+        path = os.path.join(pdf_folder, f)
+        for img in load_page_images(path, 1, pages_per_file, dpi=225):
+            yield f, img
+
+def main():
+    profiles = {"none": {}}
+    profiles.update({name: p for name, p in ocr_config["prep_profiles"].items() if p})
+    profiles["auto"] = None
+    only = sys.argv[1:]
+    if only:
+        profiles = {k: v for k, v in profiles.items() if k in only}
+
+    totals = {name: [0.0, 0.0, 0, 0.0, 0] for name in profiles}
+    for f, img in sample_pages():
+        for name, profile in profiles.items():
+            start = time.perf_counter()
+            prepped = preprocess_page(img, profile) if profile is not None else preprocess_page(img)
+            prep_time = time.perf_counter() - start
+            ocr_time, words, conf = ocr_stats(prepped)
+            t = totals[name]
+            t[0] += prep_time
+            t[1] += ocr_time
+            t[2] += words
+            t[3] += conf
+            t[4] += 1
+            print(f"{f} [{img.info.get('page_class')}] {name:8s} prep {prep_time:5.2f}s  ocr {ocr_time:6.2f}s  "
+                  f"{prepped.size[0]}x{prepped.size[1]} {prepped.mode}  words {words:5d}  conf {conf:5.1f}")
+
+    print("\nTotals")
+    for name, (prep, ocr, words, conf, n) in totals.items():
+        print(f"  {name:8s} prep {prep:7.2f}s  ocr {ocr:8.2f}s  words {words:7d}  mean conf {conf / n if n else 0:5.1f}")
+
+if __name__ == "__main__":
+    main()
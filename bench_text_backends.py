@@ -0,0 +1,65 @@
+# bench_text_backends.py
+import os
+import sys
+import time
+
+from parse_utils import clean_text, extract_api, extract_coordinates, extract_well_name
+from pdf_text import backend_order, text_backends
+from ocr_config import save_config
+
+pdf_folder = "pdfs"
+
+def score_text(pages):
+    text = clean_text("\n".join(pages))
+    chars = len(text)
+    alnum = sum(ch.isalnum() for ch in text)
+    lat, lon = extract_coordinates(text)
+    return {
+        "chars": chars,
+        "pages_with_text": sum(1 for p in pages if p.strip()),
+        "alnum_ratio": alnum / chars if chars else 0.0,
+        "fields": sum([extract_api(text) is not None, lat is not None, extract_well_name(text) is not None]),
+    }
+
+def bench(files):
+    totals = {name: {"seconds": 0.0, "chars": 0, "fields": 0, "errors": 0, "alnum": 0.0} for name in backend_order}
+    for path in files:
+        print(f"\n{os.path.basename(path)}")
+        for name in backend_order:
+            start = time.perf_counter()
+            try:
+                pages = text_backends[name](path)
+            except Exception as e:
+                print(f"  {name:10s} error: {e}")
+                totals[name]["errors"] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            s = score_text(pages)
+            t = totals[name]
+            t["seconds"] += elapsed
+            t["chars"] += s["chars"]
+            t["fields"] += s["fields"]
+            t["alnum"] += s["alnum_ratio"]
+            print(f"  {name:10s} {elapsed:7.2f}s  pages {s['pages_with_text']:4d}/{len(pages):<4d} "
+                  f"chars {s['chars']:8d}  alnum {s['alnum_ratio']:.2f}  fields {s['fields']}/3")
+
+    print("\nTotals")
+    for name, t in totals.items():
+        ok = len(files) - t["errors"]
+        print(f"  {name:10s} {t['seconds']:8.2f}s  chars {t['chars']:9d}  fields {t['fields']:4d}  "
+              f"alnum {t['alnum'] / ok if ok else 0:.2f}  errors {t['errors']}")
+
+    best_fields = max(t["fields"] for t in totals.values())
+    usable = [n for n, t in totals.items() if t["errors"] == 0 and t["fields"] == best_fields]
+    return min(usable, key=lambda n: totals[n]["seconds"]) if usable else None
+
+def main():
+    files = [os.path.join(pdf_folder, f) for f in sorted(os.listdir(pdf_folder)) if f.lower().endswith(".pdf")]
+    best = bench(files)
+    print(f"\nFastest backend with best field coverage: {best}")
+    if best and "--save" in sys.argv:
+        save_config({"text_backend": best})
+        print("Saved as text_backend in ocr_config.json")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# bench_transport.py
+# Compares handing page bitmaps to worker processes by pickling them through a
+# queue against writing them into shared memory slots and passing descriptors.
+import argparse
+import multiprocessing as mp
+import time
+
+import numpy as np
+from PIL import Image
+
+from page_transport import PageSlabs, attach_reader, read_page, release_page
+
+def _synthetic_page(width, height, mode, seed):
+    rng = np.random.default_rng(seed)
+    arr = np.full((height, width), 255, dtype=np.uint8)
+    # a few hundred dark "words" so the bitmap is not trivially compressible
+    for _ in range(400):
+        x, y = rng.integers(0, width - 60), rng.integers(0, height - 20)
+        arr[y:y + 14, x:x + rng.integers(20, 60)] = 0
+    img = Image.fromarray(arr)
+    return img.convert("1") if mode == "1" else img
+
+def _pickle_consumer(inbox, done):
+    while True:
+        img = inbox.get()
+        if img is None:
+            break
+        done.put(int(np.asarray(img)[::97, ::97].sum()))
+
+def _shm_consumer(inbox, done, shm_name, free, slot_bytes):
+    attach_reader(shm_name, free, slot_bytes)
+    while True:
+        desc = inbox.get()
+        if desc is None:
+            break
+        img = read_page(desc)
+        done.put(int(np.asarray(img)[::97, ::97].sum()))
+        del img
+        release_page(desc)
+
+def run_pickle(ctx, pages):
+    inbox, done = ctx.Queue(4), ctx.Queue()
+    proc = ctx.Process(target=_pickle_consumer, args=(inbox, done))
+    proc.start()
+    start = time.perf_counter()
+    for img in pages:
+        inbox.put(img)
+    for _ in pages:
+        done.get()
+    elapsed = time.perf_counter() - start
+    inbox.put(None)
+    proc.join()
+    return elapsed
+
+def run_shm(ctx, pages, slots):
+    slot_bytes = max(p.width * p.height for p in pages)
+    slabs = PageSlabs(ctx, slots, slot_bytes)
+    inbox, done = ctx.Queue(), ctx.Queue()
+    proc = ctx.Process(target=_shm_consumer, args=(inbox, done, slabs.shm.name, slabs.free, slot_bytes))
+    proc.start()
+    start = time.perf_counter()
+    for img in pages:
+        inbox.put(slabs.put(img))
+    for _ in pages:
+        done.get()
+    elapsed = time.perf_counter() - start
+    inbox.put(None)
+    proc.join()
+    slabs.close()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark page handoff between processes")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--dpi", type=int, default=225)
+    parser.add_argument("--mode", choices=["1", "L"], default="1")
+    parser.add_argument("--slots", type=int, default=4)
+    args = parser.parse_args()
+
+    width, height = int(8.5 * args.dpi), int(11 * args.dpi)
+    pages = [_synthetic_page(width, height, args.mode, i) for i in range(args.pages)]
+    raw_mb = sum(len(p.tobytes()) for p in pages) / 1e6
+    ctx = mp.get_context("fork")
+
+    print(f"{args.pages} pages, {width}x{height} mode {args.mode}, {raw_mb:.1f} MB of bitmap data")
+    for name, elapsed in (("pickle", run_pickle(ctx, pages)), ("shared memory", run_shm(ctx, pages, args.slots))):
+        print(f"{name:<14} {elapsed * 1000 / args.pages:7.2f} ms/page {raw_mb / elapsed:9.1f} MB/s")
+
+if __name__ == "__main__":
+    main()
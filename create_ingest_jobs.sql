@@ -0,0 +1,15 @@
+CREATE TABLE ingest_jobs (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  filename VARCHAR(255) NOT NULL,      -- PDF name in the shared pdfs/ folder
+  priority DOUBLE NOT NULL DEFAULT 0,  -- prescan cost estimate, cheapest first
+  status VARCHAR(16) NOT NULL DEFAULT 'pending',  -- pending, running, done, failed
+  attempts INT NOT NULL DEFAULT 0,
+  worker VARCHAR(128),
+  lease_expires_at DATETIME,
+  heartbeat_at DATETIME,
+  last_error TEXT,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  finished_at DATETIME,
+  UNIQUE (filename),
+  INDEX (status, priority)
+);
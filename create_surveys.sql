@@ -0,0 +1,15 @@
+CREATE TABLE surveys (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  well_id INT,
+  md DOUBLE,
+  inclination DOUBLE,
+  azimuth DOUBLE,
+  tvd DOUBLE,
+  northing DOUBLE,
+  easting DOUBLE,
+  dogleg DOUBLE,
+  latitude DOUBLE,
+  longitude DOUBLE,
+  INDEX (well_id),
+  FOREIGN KEY (well_id) REFERENCES wells(id) ON DELETE CASCADE
+);
@@ -0,0 +1,16 @@
+# db_settings.py
+# MySQL settings shared by ingestion, the web app and the maintenance
+# scripts; DB_HOST, DB_USER, DB_PASS and DB_NAME override the defaults
+import os
+
+db_config = {
+    "host": os.environ.get("DB_HOST", "localhost"),
+    "user": os.environ.get("DB_USER", "root"),
+    "password": os.environ.get("DB_PASS", "admin123"),
+    "database": os.environ.get("DB_NAME", "oil_wells"),
+}
+
+def connect(**options):
+    # pymysql is imported here so importing this module stays free
+    import pymysql
+    return pymysql.connect(**db_config, **options)
@@ -0,0 +1,114 @@
+# image_prep.py
+from typing import Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+from ocr_config import ocr_config
+
+rgb_weights = np.array([299, 587, 114], dtype=np.uint32)
+
+def to_gray(img: Image.Image) -> np.ndarray:
+    if img.mode == "1":
+        return np.asarray(img, dtype=np.uint8) * 255
+    if img.mode == "L":
+        return np.asarray(img)
+    arr = np.asarray(img.convert("RGB"))
+    return ((arr.astype(np.uint32) @ rgb_weights) // 1000).astype(np.uint8)
+
+def _window_bounds(n: int, r: int):
+    idx = np.arange(n)
+    return np.clip(idx - r, 0, n), np.clip(idx + r + 1, 0, n)
+
+def _box_sum(a: np.ndarray, r: int) -> np.ndarray:
+    # separable sliding-window sum over a (2r+1)x(2r+1) box, edges clamped;
+    # int32 is enough for 8-bit input at the window sizes used here
+    h, w = a.shape
+    x0, x1 = _window_bounds(w, r)
+    y0, y1 = _window_bounds(h, r)
+    c = np.zeros((h, w + 1), dtype=np.int32)
+    np.cumsum(a, axis=1, dtype=np.int32, out=c[:, 1:])
+    rows = c[:, x1] - c[:, x0]
+    c = np.zeros((h + 1, w), dtype=np.int32)
+    np.cumsum(rows, axis=0, out=c[1:])
+    return c[y1] - c[y0]
+
+def binarize(gray: np.ndarray, window: int = 0, t: float = 0.15) -> np.ndarray:
+    # Bradley adaptive threshold: ink where the pixel is t darker than its neighbourhood mean
+    h, w = gray.shape
+    r = (window or max(15, w // 40)) // 2
+    x0, x1 = _window_bounds(w, r)
+    y0, y1 = _window_bounds(h, r)
+    count = np.outer(y1 - y0, x1 - x0).astype(np.float32)
+    return gray * count < _box_sum(gray, r) * np.float32(1.0 - t)
+
+def despeckle(ink: np.ndarray, min_neighbors: int = 1) -> np.ndarray:
+    neighbors = _box_sum(ink.astype(np.uint8), 1) - ink
+    return ink & (neighbors > min_neighbors)
+
+def _projection_scores(ys: np.ndarray, xs: np.ndarray, angles: np.ndarray) -> np.ndarray:
+    # variance of the row projection after shearing by each angle; text lines
+    # give the sharpest profile when the shear cancels the skew
+    shifts = np.tan(np.radians(angles))
+    rows = np.rint(ys[None, :] - xs[None, :] * shifts[:, None]).astype(np.int64)
+    rows -= rows.min()
+    hist = np.zeros((len(angles), rows.max() + 1), dtype=np.int64)
+    np.add.at(hist, (np.repeat(np.arange(len(angles)), len(ys)), rows.ravel()), 1)
+    return hist.var(axis=1)
+
+def estimate_skew(ink: np.ndarray, max_angle: float = 5.0, steps: int = 21, sample: int = 4) -> float:
+    small = ink[::sample, ::sample]
+    ys, xs = np.nonzero(small)
+    if len(ys) < 100:
+        return 0.0
+    coarse = np.linspace(-max_angle, max_angle, steps)
+    best = coarse[np.argmax(_projection_scores(ys, xs, coarse))]
+    step = coarse[1] - coarse[0]
+    fine = np.linspace(best - step, best + step, 11)
+    return float(fine[np.argmax(_projection_scores(ys, xs, fine))])
+
+def crop_margins(ink: np.ndarray, border_fill: float = 0.5, pad: int = 10) -> np.ndarray:
+    ink = ink.copy()
+    h, w = ink.shape
+    # scanner borders and punch-hole shadows show up as nearly solid edge rows/columns
+    row_fill = ink.mean(axis=1)
+    col_fill = ink.mean(axis=0)
+    edge_rows = np.r_[0:h // 20, h - h // 20:h]
+    edge_cols = np.r_[0:w // 20, w - w // 20:w]
+    ink[edge_rows[row_fill[edge_rows] > border_fill], :] = False
+    ink[:, edge_cols[col_fill[edge_cols] > border_fill]] = False
+
+    rows = np.flatnonzero(ink.sum(axis=1) > 2)
+    cols = np.flatnonzero(ink.sum(axis=0) > 2)
+    if not len(rows) or not len(cols):
+        return ink
+    y0, y1 = max(rows[0] - pad, 0), min(rows[-1] + pad + 1, h)
+    x0, x1 = max(cols[0] - pad, 0), min(cols[-1] + pad + 1, w)
+    return ink[y0:y1, x0:x1]
+
+def preprocess_page(img: Image.Image, profile: Optional[Dict] = None) -> Image.Image:
+    if profile is None:
+        page_class = img.info.get("page_class", "render")
+        profile = ocr_config["prep_profiles"].get(page_class) or {}
+    if not profile:
+        return img
+
+    gray = to_gray(img)
+    if img.mode == "1":
+        ink = gray == 0
+    elif profile.get("binarize"):
+        ink = binarize(gray, profile.get("window", 0), profile.get("threshold", 0.15))
+    else:
+        ink = gray < 128
+    if profile.get("despeckle"):
+        ink = despeckle(ink)
+    if profile.get("crop"):
+        ink = crop_margins(ink)
+
+    out = Image.fromarray(~ink)
+    if profile.get("deskew"):
+        angle = estimate_skew(ink)
+        if abs(angle) >= 0.3:
+            out = out.rotate(angle, resample=Image.NEAREST, expand=True, fillcolor=1)
+    out.info.update(img.info)
+    return out
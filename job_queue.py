@@ -0,0 +1,198 @@
+# job_queue.py
+import argparse
+import os
+import socket
+import threading
+import time
+
+from db_settings import connect
+from ocr_config import ocr_config
+
+pdf_folder = "pdfs"
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def enqueue_folder(db, folder):
+    from prescan import prescan
+    added = 0
+    cur = db.cursor()
+    for f in sorted(os.listdir(folder)):
+        if not f.lower().endswith(".pdf"):
+            continue
+        try:
+            cost = prescan(os.path.join(folder, f))["cost"]
+        except Exception:
+            cost = 0.0
+        added += cur.execute("INSERT IGNORE INTO ingest_jobs (filename, priority) VALUES (%s, %s)", (f, cost))
+    db.commit()
+    return added
+
+def claim_job(db, worker):
+    # SKIP LOCKED lets every node look at the queue at once without two of
+    # them getting the same row
+    cfg = ocr_config["job_queue"]
+    cur = db.cursor()
+    try:
+        cur.execute("""
+            UPDATE ingest_jobs SET status = 'failed', last_error = 'lease expired too many times'
+            WHERE status = 'running' AND lease_expires_at < NOW() AND attempts >= %s
+        """, (cfg["max_attempts"],))
+        cur.execute("""
+            SELECT id, filename FROM ingest_jobs
+            WHERE status = 'pending'
+               OR (status = 'running' AND lease_expires_at < NOW())
+            ORDER BY priority, id
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        """)
+        row = cur.fetchone()
+        if row is None:
+            db.commit()
+            return None
+        cur.execute("""
+            UPDATE ingest_jobs SET
+                status = 'running', worker = %s, attempts = attempts + 1,
+                heartbeat_at = NOW(), lease_expires_at = NOW() + INTERVAL %s SECOND
+            WHERE id = %s
+        """, (worker, cfg["lease_s"], row[0]))
+        db.commit()
+        return row
+    except Exception:
+        db.rollback()
+        raise
+
+def finish_job(db, job_id, worker, error=None):
+    # a failed job goes back to pending until it has used up its attempts
+    cur = db.cursor()
+    status = "done"
+    if error is not None:
+        cur.execute("SELECT attempts FROM ingest_jobs WHERE id = %s", (job_id,))
+        row = cur.fetchone()
+        status = "failed" if row and row[0] >= ocr_config["job_queue"]["max_attempts"] else "pending"
+    cur.execute("""
+        UPDATE ingest_jobs SET
+            status = %s, last_error = %s, finished_at = NOW(), lease_expires_at = NULL
+        WHERE id = %s AND worker = %s
+    """, (status, error, job_id, worker))
+    db.commit()
+
+class Heartbeat(threading.Thread):
+    # renews the lease on its own connection while the job runs
+    def __init__(self, job_id, worker):
+        super().__init__(name=f"heartbeat-{job_id}", daemon=True)
+        self.job_id = job_id
+        self.worker = worker
+        self.stopped = threading.Event()
+
+    def run(self):
+        lease = ocr_config["job_queue"]["lease_s"]
+        db = connect()
+        try:
+            while not self.stopped.wait(lease / 3):
+                cur = db.cursor()
+                cur.execute("""
+                    UPDATE ingest_jobs SET heartbeat_at = NOW(), lease_expires_at = NOW() + INTERVAL %s SECOND
+                    WHERE id = %s AND worker = %s AND status = 'running'
+                """, (lease, self.job_id, self.worker))
+                db.commit()
+                if cur.rowcount == 0:
+                    print(f"Lost lease on job {self.job_id}")
+                    return
+        except Exception as e:
+            print(f"Heartbeat for job {self.job_id} failed: {e}")
+        finally:
+            db.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+def requeue_partial(db):
+    # a worker that died during a well's background pass left the well in
+    # phase 1 behind a job marked done; such jobs are run again
+    cur = db.cursor()
+    count = cur.execute("""
+        UPDATE ingest_jobs j JOIN wells w ON w.filename = j.filename
+        SET j.status = 'pending', j.finished_at = NULL, j.last_error = 'well left partial'
+        WHERE j.status = 'done' AND w.ingest_phase = 'partial'
+    """)
+    db.commit()
+    return count
+
+def ingest_job(ocr_and_extract, filepath):
+    # returns once the whole document is stored, the two-phase background
+    # pass included, so the job's lease covers all of the work
+    done = threading.Event()
+    outcome = {}
+
+    def progress(event, **info):
+        if event in ("rejected", "failed", "complete") or (event == "stored" and not info["background"]):
+            outcome.update(info, event=event)
+            done.set()
+
+    file_hash = ocr_and_extract.get_file_hash(filepath)
+    if not ocr_and_extract.process_file(filepath, file_hash, progress):
+        # stored already; finish it if it was left in phase 1
+        partial = [well_id for well_id, _, h in ocr_and_extract.get_sink().partial_wells() if h == file_hash]
+        if not partial:
+            return
+        print(f"Completing partial well {partial[0]}")
+        ocr_and_extract.queue_completion(partial[0], filepath, file_hash, "", [], 1, progress)
+    done.wait()
+    if outcome["event"] == "failed":
+        raise RuntimeError(outcome.get("error") or "ingestion failed")
+
+def run_worker(drain=False):
+    import ocr_and_extract
+    worker = worker_name()
+    db = connect()
+    print(f"Worker {worker} pulling from ingest_jobs")
+    if ocr_config["two_phase"]["enabled"]:
+        print(f"Re-queued {requeue_partial(db)} jobs whose well was left partial")
+    try:
+        while True:
+            job = claim_job(db, worker)
+            if job is None:
+                if drain:
+                    break
+                time.sleep(ocr_config["job_queue"]["poll_s"])
+                continue
+            job_id, filename = job
+            heartbeat = Heartbeat(job_id, worker)
+            heartbeat.start()
+            error = None
+            try:
+                ingest_job(ocr_and_extract, os.path.join(ocr_and_extract.pdf_folder, filename))
+            except Exception as e:
+                error = str(e)[:2000]
+                print(f"Job {job_id} failed: {error}")
+            finally:
+                heartbeat.stop()
+            finish_job(db, job_id, worker, error)
+    finally:
+        db.close()
+        if ocr_and_extract.completion_thread is not None:
+            ocr_and_extract.completion_queue.join()
+        ocr_and_extract.shutdown_pool()
+        ocr_and_extract.print_run_summary()
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared ingest job queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("enqueue", help="add every PDF in pdfs/ that is not queued yet")
+    work = sub.add_parser("work", help="claim and ingest jobs until stopped")
+    work.add_argument("--drain", action="store_true", help="exit when no job is claimable")
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        db = connect()
+        try:
+            print(f"Queued {enqueue_folder(db, pdf_folder)} new files")
+        finally:
+            db.close()
+    else:
+        run_worker(args.drain)
+
+if __name__ == "__main__":
+    main()
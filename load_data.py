@@ -1,12 +1,10 @@
-import os
 import pymysql.cursors
 import datetime
 
+from db_settings import db_config
+
 db_conf = {
-    "host": os.environ.get("DB_HOST", "localhost"),
-    "user": os.environ.get("DB_USER", "root"),
-    "password": os.environ.get("DB_PASS", "password"),
-    "db": os.environ.get("DB_NAME", "oil_wells"),
+    **db_config,
     "cursorclass": pymysql.cursors.DictCursor,
     "charset": "utf8mb4"
 }
@@ -0,0 +1,138 @@
+# memory_governor.py
+import os
+import threading
+from typing import Dict, Optional
+
+from ocr_config import ocr_config
+
+mb = 1024 * 1024
+
+def _meminfo() -> Dict[str, int]:
+    info = {}
+    with open("/proc/meminfo") as f:
+        for line in f:
+            key, value = line.split(":", 1)
+            info[key] = int(value.split()[0]) * 1024
+    return info
+
+def _process_tree() -> Dict[int, int]:
+    # pid -> rss in bytes for this process and everything below it (pool
+    # workers and the tesseract processes they start)
+    page = os.sysconf("SC_PAGE_SIZE")
+    parents = {}
+    rss = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # the command name may contain spaces; fields after it are fixed
+        fields = stat[stat.rindex(")") + 2:].split()
+        pid = int(name)
+        parents[pid] = int(fields[1])
+        rss[pid] = int(fields[21]) * page
+    tree = {os.getpid()}
+    grew = True
+    while grew:
+        grew = False
+        for pid, ppid in parents.items():
+            if ppid in tree and pid not in tree:
+                tree.add(pid)
+                grew = True
+    return {pid: rss.get(pid, 0) for pid in tree}
+
+class MemoryGovernor:
+    # sizes OCR batches and in-flight pages from measured RSS so ingestion
+    # stays under the memory budget instead of waiting for MemoryError
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.page_bytes = None
+        self.worker_bytes = 300 * mb
+        self.pool_workers = None
+        self.peaks: Dict[str, int] = {}
+
+    def enabled(self) -> bool:
+        return ocr_config["memory"]["enabled"] and os.path.exists("/proc/meminfo")
+
+    def budget(self) -> int:
+        cfg = ocr_config["memory"]
+        if cfg["budget_mb"]:
+            return cfg["budget_mb"] * mb
+        return int(_meminfo()["MemTotal"] * 0.8)
+
+    def headroom(self) -> int:
+        cfg = ocr_config["memory"]
+        tree = _process_tree()
+        used = sum(tree.values())
+        workers = [v for pid, v in tree.items() if pid != os.getpid()]
+        with self.lock:
+            if workers:
+                self.worker_bytes = max(self.worker_bytes, max(workers))
+        available = _meminfo().get("MemAvailable", 0) - cfg["reserve_mb"] * mb
+        return min(self.budget() - used, available)
+
+    def _page_estimate(self, dpi: int) -> int:
+        # a letter page as rendered RGB plus the gray/ink copies made in prep
+        return self.page_bytes or int(8.5 * dpi * 11 * dpi * 3 * 2)
+
+    def batch_size(self, wanted: int, dpi: int) -> int:
+        cfg = ocr_config["memory"]
+        if not self.enabled():
+            return wanted
+        fit = max(0, self.headroom()) // self._page_estimate(dpi)
+        size = max(cfg["min_batch"], min(wanted, int(fit)))
+        if size < wanted:
+            print(f"Memory governor: batch of {size} pages instead of {wanted}")
+        return size
+
+    def in_flight(self) -> Optional[int]:
+        # how many pages may be with OCR workers at once
+        workers = ocr_config["ocr_workers"]
+        if not self.enabled() or workers <= 1:
+            return None
+        fit = max(0, self.headroom()) // self.worker_bytes
+        return max(1, min(workers, int(fit)))
+
+    def ocr_workers(self) -> int:
+        # the OCR pool's size: cut below ocr_workers while headroom cannot hold
+        # that many workers at their peak, and restored only once it can hold
+        # all of them again, so the pool is not rebuilt on every batch
+        workers = ocr_config["ocr_workers"]
+        if not self.enabled() or workers <= 1:
+            return workers
+        fit = max(1, int(max(0, self.headroom()) // self.worker_bytes))
+        with self.lock:
+            current = min(self.pool_workers or workers, workers)
+            size = fit if fit < current else workers if fit >= workers else current
+            if size != current:
+                print(f"Memory governor: {size} OCR workers instead of {current}")
+            self.pool_workers = size
+            return size
+
+    def observe(self, name: str, before: int, pages: int) -> int:
+        # called with a batch's rendered pages in memory: updates the per-page
+        # estimate from how much the process tree grew, and the file's
+        # high-water mark
+        if not self.enabled():
+            return 0
+        used = sum(_process_tree().values())
+        with self.lock:
+            if pages and used > before:
+                grown = (used - before) // pages
+                self.page_bytes = grown if self.page_bytes is None else max(grown, (self.page_bytes * 3 + grown) // 4)
+            self.peaks[name] = max(self.peaks.get(name, 0), used)
+        return used
+
+    def usage(self) -> int:
+        return sum(_process_tree().values()) if self.enabled() else 0
+
+_governor = None
+
+def memory_governor() -> MemoryGovernor:
+    global _governor
+    if _governor is None:
+        _governor = MemoryGovernor()
+    return _governor
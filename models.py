@@ -0,0 +1,142 @@
+# models.py
+from datetime import date, datetime
+from typing import Annotated, List, Optional
+
+from pydantic import BaseModel, BeforeValidator, ConfigDict, TypeAdapter, model_validator
+
+from parse_utils import is_valid_nd_coordinate
+
+def _text(width: Optional[int] = None):
+    def coerce(v):
+        if v is None:
+            return None
+        v = ' '.join(str(v).split()) if width else str(v).strip()
+        if not v:
+            return None
+        return v[:width] if width else v
+    return BeforeValidator(coerce)
+
+def _number(cast):
+    def coerce(v):
+        if v is None or isinstance(v, bool):
+            return None
+        if isinstance(v, str):
+            v = v.replace(',', '').strip()
+        try:
+            return cast(float(v))
+        except (TypeError, ValueError, OverflowError):
+            return None
+    return BeforeValidator(coerce)
+
+def _parse_date(v):
+    if v is None or isinstance(v, date):
+        return v
+    for fmt in ("%m/%d/%Y", "%Y-%m-%d", "%m/%d/%y"):
+        try:
+            return datetime.strptime(str(v).strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+Text = Annotated[Optional[str], _text()]
+Str32 = Annotated[Optional[str], _text(32)]
+Str64 = Annotated[Optional[str], _text(64)]
+Str128 = Annotated[Optional[str], _text(128)]
+Str255 = Annotated[Optional[str], _text(255)]
+Str500 = Annotated[Optional[str], _text(500)]
+Int = Annotated[Optional[int], _number(int)]
+Float = Annotated[Optional[float], _number(float)]
+Date = Annotated[Optional[date], BeforeValidator(_parse_date)]
+
+class WellRecord(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    filename: Str255 = None
+    file_hash: Str64 = None
+    api: Str64 = None
+    well_name: Str255 = None
+    address: Str500 = None
+    latitude: Float = None
+    longitude: Float = None
+    county: Str128 = None
+    state: Str64 = None
+    operator: Str255 = None
+    qc_status: Str32 = None
+    raw_text: Text = None
+
+    @model_validator(mode="after")
+    def _qc(self):
+        if not self.api:
+            self.qc_status = "invalid"
+        elif self.latitude is None or self.longitude is None:
+            self.qc_status = "needs_review"
+        elif not is_valid_nd_coordinate(self.latitude, self.longitude):
+            self.qc_status = "needs_review"
+        elif not self.well_name or len(self.well_name) < 3:
+            self.qc_status = "needs_review"
+        else:
+            self.qc_status = "valid"
+        return self
+
+def _stim_qc(m):
+    if m.acid_percent is not None and not 0 <= m.acid_percent <= 100:
+        m.acid_percent = None
+    if m.lbs_proppant is not None and m.lbs_proppant < 0:
+        m.lbs_proppant = None
+    return m
+
+class ExtendedStim(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    treatment_type: Str128 = None
+    lbs_proppant: Int = None
+    acid_percent: Float = None
+    treatment_pressure: Float = None
+    max_treatment_rate: Float = None
+    details_text: Text = None
+
+    @model_validator(mode="after")
+    def _qc(self):
+        return _stim_qc(self)
+
+class StimulationRow(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    date_stimulated: Date = None
+    stimulated_formation: Str255 = None
+    top_ft: Int = None
+    bottom_ft: Int = None
+    stages: Int = None
+    volume: Float = None
+    volume_units: Str64 = None
+    treatment_type: Str128 = None
+    lbs_proppant: Int = None
+    acid_percent: Float = None
+    treatment_pressure: Float = None
+    max_treatment_rate: Float = None
+    additional_info: Text = None
+
+    @model_validator(mode="after")
+    def _qc(self):
+        if self.top_ft is not None and not 0 < self.top_ft < 40000:
+            self.top_ft = None
+        if self.bottom_ft is not None and not 0 < self.bottom_ft < 40000:
+            self.bottom_ft = None
+        if self.top_ft and self.bottom_ft and self.top_ft > self.bottom_ft:
+            self.top_ft, self.bottom_ft = self.bottom_ft, self.top_ft
+        return _stim_qc(self)
+
+well_records = TypeAdapter(List[WellRecord])
+stimulation_rows = TypeAdapter(List[StimulationRow])
+
+def merge_stim_rows(stim_rows: List[dict], ext: dict) -> List[dict]:
+    merged = []
+    for stim in stim_rows or [{}]:
+        row = dict(stim)
+        for key in ExtendedStim.model_fields:
+            if key != "details_text" and row.get(key) is None:
+                row[key] = ext.get(key)
+        if not row.get("additional_info"):
+            row["additional_info"] = ext.get("details_text")
+        merged.append(row)
+    return merged
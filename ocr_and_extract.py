@@ -1,10 +1,14 @@
 import os
 import hashlib
-import pymysql
-import pytesseract
-from pdf2image import convert_from_path
-from PyPDF2 import PdfReader
+import sys
 import gc
+import heapq
+import itertools
+import queue
+import threading
+import time
+from collections import Counter
+from functools import partial
 
 from parse_utils import (
     clean_text,
@@ -14,20 +18,57 @@ from parse_utils import (
     extract_county_state,
     extract_address,
     extract_coordinates,
-    parse_all_stim_and_extended,
-    is_valid_nd_coordinate
+    is_valid_nd_coordinate,
+    parse_all_stim_and_extended
 )
+from pdf_text import extract_page_texts
+from page_targets import missing_fields, candidate_pages
+from memory_governor import memory_governor, mb
+from pipeline import Pipeline
+from sinks import collapse_stim_duplicates, open_sink
+from archive_source import Member, hold, is_archive, release, stream_members
+from ocr_config import ocr_config
+from db_settings import db_config
+from models import WellRecord, ExtendedStim, merge_stim_rows, stimulation_rows, well_records
+# the OCR stack (numpy, PIL, pikepdf, pdf2image, pytesseract) is imported by
+# the functions that render or OCR pages, so reparse and the web app's
+# imports do not pay for it
 
 pdf_folder = "pdfs"
-db_config = {
-    "host": "localhost",
-    "user": "root",
-    "password": "admin123",
-    "database": "oil_wells",
-}
-
-conn = pymysql.connect(**db_config)
-cursor = conn.cursor()
+run_stats = Counter()
+# (seconds, file, page, status) of the slowest OCR'd pages this run
+slow_pages = []
+stats_lock = threading.Lock()
+# wells whose remaining pages are OCR'd in the background (two-phase ingestion)
+completion_queue = queue.Queue()
+completion_thread = None
+
+# where results go (ocr_config "sink"); opened on first use so nothing
+# connects to MySQL just by importing this module
+_sink = None
+_sink_lock = threading.Lock()
+# threads that ingest side by side (web uploads) each get their own sink
+_thread_sinks = threading.local()
+
+def get_sink():
+    global _sink
+    sink = getattr(_thread_sinks, "sink", None)
+    if sink is not None:
+        return sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = open_sink(ocr_config["sink"], ocr_config["sink_path"], db_config)
+            print(f"Writing results to {_sink.name}" + (f" ({ocr_config['sink_path']})" if ocr_config["sink_path"] else ""))
+    return _sink
+
+def save_boilerplate():
+    # nothing to save when no page went through the OCR path
+    if "page_fingerprint" in sys.modules:
+        sys.modules["page_fingerprint"].boilerplate_library().save()
+
+def shutdown_pool():
+    if "ocr_worker" in sys.modules:
+        sys.modules["ocr_worker"].shutdown_pool()
 
 def get_file_hash(filepath):
     hasher = hashlib.sha256()
@@ -36,68 +77,184 @@ def get_file_hash(filepath):
             hasher.update(chunk)
     return hasher.hexdigest()
 
-def already_processed(file_hash):
-    cursor.execute("SELECT id FROM wells WHERE file_hash = %s", (file_hash,))
-    return cursor.fetchone() is not None
-
-def ocr_pdf_to_text(filepath):
+def use_thread_sink():
+    # gives the calling thread its own connection; get_sink() returns it there
+    if getattr(_thread_sinks, "sink", None) is None:
+        _thread_sinks.sink = get_sink().clone()
+    return _thread_sinks.sink
+
+def already_processed(file_hash, sink=None):
+    return (sink or get_sink()).already_processed(file_hash)
+
+def record_page_time(seconds, filepath, page, status):
+    entry = (seconds, os.path.basename(filepath), page, status)
+    with stats_lock:
+        if len(slow_pages) < ocr_config["ocr_watchdog"]["report_slowest"]:
+            heapq.heappush(slow_pages, entry)
+        elif slow_pages and seconds > slow_pages[0][0]:
+            heapq.heapreplace(slow_pages, entry)
+
+def prepare_page(img):
+    # returns (image, fingerprint), or (None, None) when the page needs no OCR
+    from image_prep import preprocess_page
+    from page_fingerprint import boilerplate_library, page_fingerprint
+    from page_orientation import orient_page
+    from page_profile import classify_page, page_ink, profile_page
+    img = preprocess_page(img)
+    if ocr_config["orientation"]["enabled"]:
+        img, rotation = orient_page(img)
+        if rotation:
+            run_stats[f"pages_rotated_{rotation}"] += 1
+            print(f"Rotated page by {rotation} degrees")
+    if ocr_config["skip_textless_pages"]:
+        kind = classify_page(profile_page(page_ink(img)))
+        if kind != "text":
+            run_stats[f"pages_skipped_{kind}"] += 1
+            return None, None
+    fp = None
+    if ocr_config["boilerplate"]["enabled"]:
+        fp = page_fingerprint(img)
+        if boilerplate_library().is_boilerplate(fp):
+            run_stats["pages_skipped_boilerplate"] += 1
+            return None, None
+    return img, fp
+
+def has_required_fields(text, stim_tables):
+    # enough for the well to be inserted and pinned on the map
+    lat, lon = extract_coordinates(text)
+    return bool(extract_api(text)) and lat is not None and lon is not None and bool(extract_well_name(text))
+
+def has_fields_and_stims(text, stim_tables):
+    api_found = extract_api(text)
+    coords = extract_coordinates(text)
+    coords_ok = coords[0] is not None and coords[1] is not None
+
+    stim_present = False
+    if stim_tables:
+        stim_present = True
+    else:
+        stim_rows, ext = parse_all_stim_and_extended(text)
+        if stim_rows:
+            stim_present = True
+        if ext.get('treatment_type') or ext.get('lbs_proppant') or ext.get('treatment_pressure'):
+            stim_present = True
+
+    return bool(api_found and coords_ok and stim_present)
+
+def prepare_batch(images):
+    prepared = []
+    for img in images:
+        page, fp = prepare_page(img)
+        # drop the rendered bitmap as soon as its prepared copy exists
+        if page is not img:
+            img.close()
+        if page is not None:
+            prepared.append((page, fp))
+    return prepared
+
+def ocr_deadline():
+    budget = ocr_config["ocr_watchdog"]["document_budget_s"]
+    return time.monotonic() + budget if budget else None
+
+def ocr_batch(filepath, prepared, deadline=None, nice=0, stim_tables=None, on_page=None):
+    # OCRs prepared (image, fingerprint) pages and returns their text; the
+    # images are closed once read. on_page(page number) follows each result
+    from ocr_worker import ocr_pages
+    from page_fingerprint import boilerplate_library
+    # each page's timeout is cut to what is left of the deadline when it
+    # starts, and pages are not handed out once it has passed
+    governor = memory_governor()
+    results = ocr_pages([img for img, _ in prepared], ocr_config["ocr_watchdog"]["page_timeout_s"], nice,
+                        max_in_flight=governor.in_flight(), workers=governor.ocr_workers(),
+                        on_page=on_page and (lambda i: on_page(prepared[i][0].info.get("page"))),
+                        deadline=deadline)
     text = ""
-
-    try:
-        reader = PdfReader(filepath)
-        for page in reader.pages:
-            extracted = page.extract_text()
-            if extracted:
-                text += extracted + "\n"
-        if len(text.strip()) > 400 and extract_api(text):
-            print("Using direct PDF text extraction")
-            return clean_text(text)
-        if text.strip():
-            print("Text extracted but API not found, running OCR fallback")
-    except Exception:
-        pass
-
-    try:
-        reader = PdfReader(filepath)
-        total_pages = len(reader.pages)
-    except Exception:
-        total_pages = None
-
-    batch_size = 12
-    current_page = 1
+    for (page_text, rows, seconds, status), (img, fp) in zip(results, prepared):
+        page = img.info.get("page")
+        img.close()
+        if status == "over_budget":
+            run_stats["pages_over_budget"] += 1
+            continue
+        record_page_time(seconds, filepath, page, status)
+        if status != "ok":
+            run_stats[f"pages_{status}"] += 1
+            print(f"Page {page}: tesseract timed out"
+                  + (", read at lower resolution" if status == "retried" else ", skipped"))
+        if status == "timeout":
+            continue
+        run_stats["pages_ocr"] += 1
+        text += page_text + "\n"
+        if fp is not None:
+            boilerplate_library().observe(fp, page_text, os.path.basename(filepath))
+        if stim_tables is not None:
+            stim_tables.extend(rows)
+    return text
+
+def ocr_pdf_to_text(filepath, stim_tables=None, file_hash=None, first_page=1, stop_when=has_fields_and_stims, nice=0,
+                    progress=None):
+    # returns (text, next_page); next_page is set when stop_when ended OCR
+    # before the last page. progress(page=, pages=) is called as pages are read
+    backend, pages = extract_page_texts(filepath, ocr_config["text_backend"])
+    text = "".join(page + "\n" for page in pages if page)
+    if len(text.strip()) > 400 and extract_api(text):
+        print(f"Using direct PDF text extraction ({backend})")
+        if progress is not None:
+            progress(page=len(pages), pages=len(pages))
+        return clean_text(text), None
+    if first_page > 1:
+        # the text layer was kept with the first pass
+        text = ""
+    elif text.strip():
+        print("Text extracted but API not found, running OCR fallback")
+
+    from page_images import load_page_images
+    total_pages = len(pages) or None
+    page_progress = None
+    if progress is not None:
+        page_progress = lambda page: progress(page=page, pages=total_pages)
+
+    batch_size = ocr_config["batch_size"]
+    current_page = first_page
+    next_page = None
+    governor = memory_governor()
+    name = os.path.basename(filepath)
+    watchdog = ocr_config["ocr_watchdog"]
+    deadline = ocr_deadline()
 
     while total_pages and current_page <= total_pages:
+        if deadline is not None and time.monotonic() > deadline:
+            print(f"OCR budget of {watchdog['document_budget_s']}s used up, stopping at page {current_page}")
+            run_stats["documents_over_budget"] += 1
+            break
         try:
-            last_page = min(current_page + batch_size - 1, total_pages)
+            size = governor.batch_size(batch_size, ocr_config["ocr_dpi"])
+            last_page = min(current_page + size - 1, total_pages)
             print(f"OCR pages {current_page} to {last_page}")
+            before = governor.usage()
 
-            images = convert_from_path(
+            images = load_page_images(
                 filepath,
-                dpi=225,
-                first_page=current_page,
-                last_page=last_page
+                current_page,
+                last_page,
+                dpi=ocr_config["ocr_dpi"],
+                stats=run_stats,
+                file_hash=file_hash
             )
+            governor.observe(name, before, len(images))
 
-            for img in images:
-                text += pytesseract.image_to_string(img, config="--psm 6") + "\n"
-                del img
-
+            prepared = prepare_batch(images)
             del images
+            text += ocr_batch(filepath, prepared, deadline, nice, stim_tables, page_progress)
+            del prepared
+            if page_progress is not None:
+                # pages skipped as blank or boilerplate count as read too
+                page_progress(last_page)
             gc.collect()
 
-            stim_rows, ext = parse_all_stim_and_extended(text)
-            api_found = extract_api(text)
-            coords = extract_coordinates(text)
-            coords_ok = coords[0] is not None and coords[1] is not None
-
-            stim_present = False
-            if stim_rows:
-                stim_present = True
-            if ext.get('treatment_type') or ext.get('lbs_proppant') or ext.get('treatment_pressure'):
-                stim_present = True
-
-            if api_found and coords_ok and stim_present:
-                print("Required metadata and stimulation found, stopping OCR early")
+            if stop_when is not None and stop_when(text, stim_tables):
+                print(f"Required metadata found, stopping OCR early after page {last_page}")
+                if last_page < total_pages:
+                    next_page = last_page + 1
                 break
 
             current_page = last_page + 1
@@ -111,158 +268,510 @@ def ocr_pdf_to_text(filepath):
             batch_size = max(4, batch_size // 2)
             gc.collect()
 
-    return clean_text(text)
+    return clean_text(text), next_page
 
-def validate_well_record(data):
-    if not data.get("api"):
-        return "invalid"
-    if data.get("latitude") is None or data.get("longitude") is None:
-        return "needs_review"
-    if not is_valid_nd_coordinate(data["latitude"], data["longitude"]):
-        return "needs_review"
-    if not data.get("well_name") or len(str(data.get("well_name")).strip()) < 3:
-        return "needs_review"
-    return "valid"
+def build_stim_rows(stim_rows, ext):
+    ext = ExtendedStim.model_validate(ext)
+    if not stim_rows and not any([ext.treatment_type, ext.lbs_proppant, ext.treatment_pressure, ext.max_treatment_rate]):
+        return []
+    return stimulation_rows.validate_python(merge_stim_rows(stim_rows, ext.model_dump()))
 
-def save_well(data):
-    try:
-        if data.get("address") and len(data["address"]) > 500:
-            data["address"] = data["address"][:500]
-
-        cursor.execute("""
-            INSERT INTO wells (
-                filename, file_hash, api, well_name, address,
-                latitude, longitude, county, state, operator,
-                qc_status, raw_text
-            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            ON DUPLICATE KEY UPDATE
-                raw_text = VALUES(raw_text),
-                latitude = VALUES(latitude),
-                longitude = VALUES(longitude),
-                qc_status = VALUES(qc_status)
-        """, (
-            data.get("filename"),
-            data.get("file_hash"),
-            data.get("api"),
-            data.get("well_name"),
-            data.get("address"),
-            data.get("latitude"),
-            data.get("longitude"),
-            data.get("county"),
-            data.get("state"),
-            data.get("operator"),
-            data.get("qc_status"),
-            data.get("raw_text")
-        ))
-        conn.commit()
-        cursor.execute("SELECT id FROM wells WHERE api = %s", (data.get("api"),))
-        row = cursor.fetchone()
-        return row[0] if row else None
-    except Exception as e:
-        print(f"DB error while saving well: {e}")
-        conn.rollback()
-        return None
-
-def save_stimulations(well_id, stim_rows, ext):
-    if not stim_rows and not any([ext.get('treatment_type'), ext.get('lbs_proppant'), ext.get('treatment_pressure'), ext.get('max_treatment_rate')]):
-        return
-    try:
-        for stim in stim_rows or [{}]:
-            cursor.execute("""
-                INSERT INTO stimulations (
-                    well_id,
-                    date_stimulated,
-                    stimulated_formation,
-                    top_ft,
-                    bottom_ft,
-                    stages,
-                    volume,
-                    volume_units,
-                    treatment_type,
-                    lbs_proppant,
-                    acid_percent,
-                    treatment_pressure,
-                    max_treatment_rate,
-                    additional_info
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            """, (
-                well_id,
-                stim.get("date_stimulated"),
-                stim.get("stimulated_formation"),
-                stim.get("top_ft"),
-                stim.get("bottom_ft"),
-                stim.get("stages"),
-                stim.get("volume"),
-                stim.get("volume_units"),
-                ext.get("treatment_type"),
-                ext.get("lbs_proppant"),
-                ext.get("acid_percent"),
-                ext.get("treatment_pressure"),
-                ext.get("max_treatment_rate"),
-                stim.get("additional_info") or ext.get("details_text")
-            ))
-        conn.commit()
-    except Exception as e:
-        print(f"DB error while saving stimulations: {e}")
-        conn.rollback()
-
-def process_file(filepath):
-    print(f"\nProcessing {filepath}")
-    file_hash = get_file_hash(filepath)
-    if already_processed(file_hash):
-        print("Skipping (already processed)")
-        return
-
-    text = ocr_pdf_to_text(filepath)
-
-    api = extract_api(text)
-    well_name = extract_well_name(text)
-    operator = extract_operator(text)
+def extract_well_fields(text):
     county, state = extract_county_state(text)
-    address = extract_address(text)
     latitude, longitude = extract_coordinates(text)
-    stim_rows, ext = parse_all_stim_and_extended(text)
-
-    well_data = {
-        "filename": os.path.basename(filepath),
-        "file_hash": file_hash,
-        "api": api,
-        "well_name": well_name,
-        "address": address,
+    return {
+        "api": extract_api(text),
+        "well_name": extract_well_name(text),
+        "address": extract_address(text),
         "latitude": latitude,
         "longitude": longitude,
         "county": county,
         "state": state or "North Dakota",
-        "operator": operator,
+        "operator": extract_operator(text),
         "raw_text": text
     }
 
-    qc_status = validate_well_record(well_data)
-    well_data["qc_status"] = qc_status
-
-    print(f"QC status: {qc_status}")
-    print(f"API: {api}")
-    print(f"Coordinates: {latitude}, {longitude}")
+def build_record(filepath, file_hash, text):
+    well_data = extract_well_fields(text)
+    well_data["filename"] = os.path.basename(filepath)
+    well_data["file_hash"] = file_hash
+    return WellRecord.model_validate(well_data)
 
-    if qc_status == "invalid":
+def save_details(well_id, record, text, stim_tables, sink=None, replace=False):
+    sink = sink or get_sink()
+    stim_rows, ext = parse_all_stim_and_extended(text)
+    if stim_tables:
+        stim_rows = stim_tables
+    rows, duplicates = collapse_stim_duplicates(build_stim_rows(stim_rows, ext))
+    if duplicates:
+        print(f"Stim rows: {duplicates} repeated a date, formation and interval and were merged")
+    if rows or replace:
+        inserted, updated, deleted = sink.save_stimulations(well_id, rows, replace)
+        print(f"Stim rows: {inserted} inserted, {updated} updated, {deleted} deleted, "
+              f"{len(rows) - inserted - updated} unchanged")
+    if rows and not stim_rows:
+        print("No structured stim rows; saved extended stim summary")
+
+    from survey_utils import compute_trajectory, extract_surveys
+    stations = extract_surveys(text)
+    if stations is not None:
+        # stations are only placed on the map from a surface location that
+        # passes the North Dakota check; otherwise lat/lon stay NULL
+        located = (record.latitude is not None and record.longitude is not None
+                   and is_valid_nd_coordinate(record.latitude, record.longitude))
+        traj = compute_trajectory(stations, *((record.latitude, record.longitude) if located else (None, None)))
+        sink.save_surveys(well_id, traj)
+        print(f"Inserted {len(stations)} survey stations, bottom hole TVD {traj['tvd'][-1]:.0f} ft")
+
+def process_file(filepath, file_hash=None, progress=None):
+    # returns False when the file was already in the sink. progress(event,
+    # **info) hears "ocr" (page, pages), then "stored" (well_id, qc_status,
+    # background) or "rejected"/"failed", and for two-phase wells
+    # "background" pages followed by "complete"
+    print(f"\nProcessing {filepath}")
+    file_hash = file_hash or get_file_hash(filepath)
+    if already_processed(file_hash):
+        print("Skipping (already processed)")
+        return False
+
+    two_phase = ocr_config["two_phase"]["enabled"]
+    stim_tables = []
+    text, next_page = ocr_pdf_to_text(
+        filepath, stim_tables, file_hash,
+        stop_when=has_required_fields if two_phase else has_fields_and_stims,
+        progress=progress and partial(progress, "ocr")
+    )
+    run_stats["files_processed"] += 1
+    save_boilerplate()
+
+    record = build_record(filepath, file_hash, text)
+    store_record(filepath, file_hash, record, text, stim_tables, next_page, progress)
+    return True
+
+def ingest_archive(path, partial=None):
+    # partial: file hash -> well id of phase-1 wells whose file was not in
+    # pdfs/; a member matching one is completed instead of skipped
+    for member in stream_members(path):
+        if member.path is None:
+            member.done(skipped=True)
+            continue
+        skipped = True
+        try:
+            if partial and member.file_hash in partial:
+                queue_completion(partial.pop(member.file_hash), member.path, member.file_hash, "", [], 1)
+                skipped = False
+            else:
+                skipped = not process_file(member.path, member.file_hash)
+        except Exception as e:
+            print(f"Failed on {member.name}: {e}")
+        finally:
+            member.done(skipped)
+
+def store_record(filepath, file_hash, record, text, stim_tables, next_page=None, progress=None):
+    two_phase = ocr_config["two_phase"]["enabled"]
+    progress = progress or (lambda event, **info: None)
+    print(f"QC status: {record.qc_status}")
+    print(f"API: {record.api}")
+    print(f"Coordinates: {record.latitude}, {record.longitude}")
+
+    if record.qc_status == "invalid":
         print("Record rejected (invalid)")
+        progress("rejected", qc_status=record.qc_status)
         return
 
-    well_id = save_well(well_data)
+    sink = get_sink()
+    well_id = sink.save_well(record)
 
     if well_id:
-        save_stimulations(well_id, stim_rows, ext)
-        if stim_rows:
-            print(f"Inserted {len(stim_rows)} stim rows")
+        background = bool(two_phase and next_page)
+        if background:
+            # the well is on the map now; the rest of the file is read later
+            sink.set_ingest_phase(well_id, "partial")
+            queue_completion(well_id, filepath, file_hash, text, stim_tables, next_page, progress)
+            print(f"Pages {next_page}+ queued for background OCR")
         else:
-            print("No structured stim rows; saved extended stim summary")
+            save_details(well_id, record, text, stim_tables, sink)
+        progress("stored", well_id=well_id, qc_status=record.qc_status, background=background)
+    else:
+        progress("failed", error="well could not be saved")
 
     print("Done")
 
-def main():
-    for file in os.listdir(pdf_folder):
-        if file.lower().endswith(".pdf"):
-            process_file(os.path.join(pdf_folder, file))
+def complete_well(job):
+    # phase 2: OCR the pages phase 1 did not need, at low CPU priority, then
+    # replace raw_text, stimulations and surveys with the full-document values
+    sink = get_sink().clone()
+    progress = job["progress"]
+    try:
+        stim_tables = list(job["stim_tables"])
+        rest, _ = ocr_pdf_to_text(
+            job["filepath"], stim_tables, job["file_hash"],
+            first_page=job["first_page"], stop_when=None, nice=ocr_config["two_phase"]["nice"],
+            progress=progress and partial(progress, "background")
+        )
+        text = "\n".join(t for t in (job["text"], rest) if t)
+        record = build_record(job["filepath"], job["file_hash"], text)
+        sink.update_well(job["well_id"], {
+            "well_name": record.well_name,
+            "address": record.address,
+            "operator": record.operator,
+            "raw_text": record.raw_text,
+            "qc_status": record.qc_status,
+            "ingest_phase": "complete",
+        }, keep_existing=("well_name", "address", "operator"))
+        save_details(job["well_id"], record, text, stim_tables, sink, replace=True)
+        save_boilerplate()
+        run_stats["files_completed_background"] += 1
+        print(f"Background OCR finished for {os.path.basename(job['filepath'])}")
+        if progress:
+            progress("complete")
+    finally:
+        if sink is not _sink:
+            sink.close()
+        # an archive member's temp copy can go now
+        release(job["filepath"])
+
+def _completion_worker():
+    while True:
+        job = completion_queue.get()
+        try:
+            complete_well(job)
+        except Exception as e:
+            print(f"Background OCR failed for {job['filepath']}: {e}")
+            if job["progress"]:
+                job["progress"]("failed", error=str(e))
+        finally:
+            completion_queue.task_done()
+
+def queue_completion(well_id, filepath, file_hash, text, stim_tables, first_page, progress=None):
+    global completion_thread
+    if completion_thread is None:
+        completion_thread = threading.Thread(target=_completion_worker, name="ocr-completion", daemon=True)
+        completion_thread.start()
+    hold(filepath)
+    completion_queue.put({
+        "well_id": well_id, "filepath": filepath, "file_hash": file_hash,
+        "text": text, "stim_tables": stim_tables, "first_page": first_page, "progress": progress,
+    })
+
+def resume_partial():
+    # wells left in phase 1 by an interrupted run are completed from page 1;
+    # returns file hash -> well id for those whose file is not in pdfs/
+    # (archive members, picked up when their archive is read again)
+    missing = {}
+    for well_id, filename, file_hash in get_sink().partial_wells():
+        filepath = os.path.join(pdf_folder, filename or "")
+        if os.path.exists(filepath):
+            queue_completion(well_id, filepath, file_hash, "", [], 1)
+        else:
+            missing[file_hash] = well_id
+    return missing
+
+def reparse_all(batch_size=1000):
+    # stimulations parsed again from raw_text go through the same diff as
+    # ingestion: new rows are added and changed ones updated, while stored
+    # rows the text no longer yields (read from table word boxes) are kept
+    sink = get_sink()
+    updated = 0
+    stim_totals = [0, 0, 0, 0]
+    for chunk in sink.reparse_chunks(batch_size):
+        data = []
+        for _, filename, file_hash, text in chunk:
+            fields = extract_well_fields(text or "")
+            fields.update(filename=filename, file_hash=file_hash, raw_text=text)
+            data.append(fields)
+        records = well_records.validate_python(data)
+
+        stims = []
+        for wid, _, _, text in chunk:
+            if text:
+                stim_rows, ext = parse_all_stim_and_extended(text)
+                rows, duplicates = collapse_stim_duplicates(build_stim_rows(stim_rows, ext))
+                stim_totals[3] += duplicates
+                stims.extend((wid, stim) for stim in rows)
+
+        counts = sink.apply_reparse([(row[0], r) for row, r in zip(chunk, records)], stims)
+        stim_totals[:3] = [t + c for t, c in zip(stim_totals, counts)]
+        updated += len(chunk)
+        print(f"Reparsed {updated} wells")
+    print("Stim rows: {} inserted, {} updated, {} deleted, {} duplicates merged".format(*stim_totals))
+
+def _page_texts_for_scoring(filepath, file_hash):
+    # text layer where a page has one, a quick low-DPI OCR where it does not
+    from ocr_worker import ocr_pages
+    from page_images import load_page_images
+    _, layer = extract_page_texts(filepath, ocr_config["text_backend"])
+    texts = {n: t for n, t in enumerate(layer, 1) if len(t.strip()) >= 50}
+    scan = [n for n in range(1, len(layer) + 1) if n not in texts]
+    dpi = ocr_config["repair"]["scan_dpi"]
+    for n in scan:
+        for img in load_page_images(filepath, n, n, dpi=dpi, stats=run_stats, file_hash=file_hash):
+            img, _ = prepare_page(img)
+            if img is not None:
+                text, _, _, _ = ocr_pages([img], ocr_config["ocr_watchdog"]["page_timeout_s"])[0]
+                texts[n] = texts.get(n, "") + text
+    return texts
+
+def repair_well(filepath, file_hash, well_name, lat, lon, raw_text, fields):
+    from image_prep import preprocess_page
+    from ocr_worker import ocr_pages
+    from page_images import load_page_images
+    from page_orientation import orient_page
+    cfg = ocr_config["repair"]
+    page_texts = _page_texts_for_scoring(filepath, file_hash)
+    repaired = []
+    for field in fields:
+        settings = cfg["fields"][field]
+        pages = candidate_pages(page_texts, field, cfg["top_pages"])
+        print(f"  {field}: pages {[n for _, n in pages]}")
+        for _, n in pages:
+            for img in load_page_images(filepath, n, n, dpi=settings["dpi"], stats=run_stats, file_hash=file_hash):
+                img = preprocess_page(img)
+                if ocr_config["orientation"]["enabled"]:
+                    img, _ = orient_page(img)
+                text, _, _, status = ocr_pages([img], ocr_config["ocr_watchdog"]["page_timeout_s"],
+                                               config=settings["tesseract"])[0]
+                run_stats["pages_repair_ocr"] += 1
+                if status != "timeout":
+                    repaired.append(clean_text(text))
+    if not repaired:
+        return None
+    # re-read pages go first so the extractors, which take the first match,
+    # prefer them now and on later --reparse runs
+    text = "\n".join(repaired + [raw_text or ""])
+    data = build_record(filepath, file_hash, text).model_dump()
+    # only the missing fields may change
+    if "well_name" not in fields:
+        data["well_name"] = well_name
+    if "coordinates" not in fields:
+        data["latitude"], data["longitude"] = lat, lon
+    return WellRecord.model_validate(data)
+
+def repair_needs_review(limit=None):
+    sink = get_sink()
+    rows = sink.needs_review_wells(limit)
+    fixed = 0
+    for well_id, filename, file_hash, well_name, lat, lon, raw_text in rows:
+        filepath = os.path.join(pdf_folder, filename or "")
+        fields = missing_fields(well_name, lat, lon)
+        if not fields or not os.path.exists(filepath):
+            continue
+        print(f"\nRepairing {filename} (missing {', '.join(fields)})")
+        try:
+            record = repair_well(filepath, file_hash, well_name, lat, lon, raw_text, fields)
+        except Exception as e:
+            print(f"Repair failed: {e}")
+            record = None
+        if record is None or record.qc_status != "valid":
+            run_stats["wells_repair_failed"] += 1
+            print("QC still failing, left as needs_review")
+            continue
+        if not sink.update_well(well_id, {
+            "well_name": record.well_name,
+            "latitude": record.latitude,
+            "longitude": record.longitude,
+            "qc_status": record.qc_status,
+            "raw_text": record.raw_text,
+        }):
+            continue
+        fixed += 1
+        run_stats["wells_repaired"] += 1
+        print(f"Repaired: {record.well_name} at {record.latitude}, {record.longitude}")
+    save_boilerplate()
+    print(f"\nRepaired {fixed} of {len(rows)} needs_review wells")
+
+def print_run_summary():
+    print("\nRun summary")
+    for key in sorted(run_stats):
+        print(f"  {key}: {run_stats[key]}")
+    peaks = memory_governor().peaks
+    if peaks:
+        print("Memory high-water marks")
+        for filename, peak in sorted(peaks.items(), key=lambda p: -p[1])[:ocr_config["ocr_watchdog"]["report_slowest"]]:
+            print(f"  {peak / mb:8.0f} MB  {filename}")
+    if slow_pages:
+        print("Slowest pages")
+        for seconds, filename, page, status in sorted(slow_pages, reverse=True):
+            print(f"  {seconds:7.1f}s  {filename} page {page}" + ("" if status == "ok" else f" ({status})"))
+
+def run_pipeline(files, partial=None):
+    # render -> prepare -> OCR -> parse -> store, each stage on its own
+    # thread(s) with bounded queues in between; tesseract itself runs in the
+    # OCR worker processes
+    from page_images import load_page_images
+    cfg = ocr_config["pipeline"]
+    stop_when = has_required_fields if ocr_config["two_phase"]["enabled"] else has_fields_and_stims
+    governor = memory_governor()
+    # the store stage owns the module sink; lookups get their own connection
+    read_db = get_sink().clone()
+
+    def render(item):
+        # item is a PDF path or an archive Member; a member's temp copy is
+        # released by the store stage, or here if the file never gets there
+        member = item if isinstance(item, Member) else None
+        if member is not None and member.path is None:
+            member.done(skipped=True)
+            return
+        filepath = member.path if member else item
+        file_hash = member.file_hash if member else get_file_hash(filepath)
+        if partial and file_hash in partial:
+            queue_completion(partial.pop(file_hash), filepath, file_hash, "", [], 1)
+            if member:
+                member.done()
+            return
+        if already_processed(file_hash, read_db):
+            print(f"Skipping {filepath} (already processed)")
+            if member:
+                member.done(skipped=True)
+            return
+        try:
+            yield from render_document(filepath, file_hash, member)
+        except Exception:
+            if member:
+                member.done(skipped=True)
+            raise
+
+    def render_document(filepath, file_hash, member):
+        backend, pages = extract_page_texts(filepath, ocr_config["text_backend"])
+        doc = {
+            "filepath": filepath, "file_hash": file_hash, "stim_tables": [], "next_page": None,
+            "text": "".join(page + "\n" for page in pages if page), "total": len(pages),
+            "stop": threading.Event(), "deadline": ocr_deadline(), "member": member,
+        }
+        if len(doc["text"].strip()) > 400 and extract_api(doc["text"]):
+            print(f"{os.path.basename(filepath)}: direct PDF text extraction ({backend})")
+            yield "done", doc
+            return
+        page = 1
+        while page <= doc["total"] and not doc["stop"].is_set():
+            if doc["deadline"] is not None and time.monotonic() > doc["deadline"]:
+                print(f"{os.path.basename(filepath)}: OCR budget used up, stopping at page {page}")
+                run_stats["documents_over_budget"] += 1
+                break
+            size = governor.batch_size(ocr_config["batch_size"], ocr_config["ocr_dpi"])
+            last = min(page + size - 1, doc["total"])
+            before = governor.usage()
+            try:
+                images = load_page_images(filepath, page, last, dpi=ocr_config["ocr_dpi"],
+                                          stats=run_stats, file_hash=file_hash)
+            except Exception as e:
+                print(f"{os.path.basename(filepath)}: render error on pages {page}-{last}: {e}")
+                break
+            governor.observe(os.path.basename(filepath), before, len(images))
+            # blocks while prefetch_batches rendered batches are already waiting
+            yield "batch", doc, page, last, images
+            page = last + 1
+        yield "done", doc
+
+    def _drop(images):
+        for img in images:
+            (img[0] if isinstance(img, tuple) else img).close()
+
+    def prepare(item):
+        if item[0] == "batch":
+            _, doc, first, last, images = item
+            if doc["stop"].is_set():
+                _drop(images)
+                return
+            yield "batch", doc, first, last, prepare_batch(images)
+        else:
+            yield item
+
+    def ocr(item):
+        if item[0] == "batch":
+            _, doc, first, last, prepared = item
+            if doc["stop"].is_set():
+                # prefetched past the point where OCR could stop
+                _drop(prepared)
+                return
+            print(f"OCR {os.path.basename(doc['filepath'])} pages {first} to {last}")
+            doc["text"] += ocr_batch(doc["filepath"], prepared, doc["deadline"], 0, doc["stim_tables"])
+            gc.collect()
+            if stop_when(doc["text"], doc["stim_tables"]):
+                doc["stop"].set()
+                if last < doc["total"]:
+                    doc["next_page"] = last + 1
+        else:
+            doc = item[1]
+            run_stats["files_processed"] += 1
+            save_boilerplate()
+            yield doc
+
+    def parse(doc):
+        try:
+            text = clean_text(doc["text"])
+            record = build_record(doc["filepath"], doc["file_hash"], text)
+        except Exception:
+            if doc["member"]:
+                doc["member"].done(skipped=True)
+            raise
+        yield doc, text, record
+
+    def store(item):
+        doc, text, record = item
+        print(f"\nStoring {doc['filepath']}")
+        try:
+            store_record(doc["filepath"], doc["file_hash"], record, text, doc["stim_tables"], doc["next_page"])
+        finally:
+            if doc["member"]:
+                doc["member"].done()
+        return ()
+
+    pipeline = (
+        Pipeline(cfg["report_s"])
+        .stage("render", render, queue_size=1)
+        .stage("prepare", prepare, queue_size=cfg["prefetch_batches"])
+        .stage("ocr", ocr, queue_size=cfg["prefetch_batches"])
+        .stage("parse", parse, queue_size=cfg["parse_queue"])
+        .stage("store", store, queue_size=cfg["store_queue"])
+    )
+    try:
+        stats = pipeline.run(files)
+    finally:
+        if read_db is not _sink:
+            read_db.close()
+    for name, st in stats.items():
+        run_stats[f"pipeline_max_queue_{name}"] = st["max_depth"]
+
+def main(use_pipeline=False, archives=()):
+    # archives: ZIP/TAR bundles read in place, besides any found in pdfs/
+    partial = resume_partial() if ocr_config["two_phase"]["enabled"] else {}
+    files = [os.path.join(pdf_folder, f) for f in os.listdir(pdf_folder) if f.lower().endswith(".pdf")]
+    archives = list(archives) + [os.path.join(pdf_folder, f) for f in os.listdir(pdf_folder) if is_archive(f)]
+    if ocr_config["scheduling"]["enabled"]:
+        from prescan import schedule
+        files = schedule(files)
+    if use_pipeline or ocr_config["pipeline"]["enabled"]:
+        # members are copied out one archive at a time as the render stage asks
+        run_pipeline(itertools.chain(files, *(stream_members(a) for a in archives)), partial)
+    else:
+        for filepath in files:
+            process_file(filepath)
+        for archive in archives:
+            ingest_archive(archive, partial)
+    if completion_thread is not None:
+        print(f"\nWaiting for background OCR ({completion_queue.qsize()} files queued)")
+        completion_queue.join()
+    shutdown_pool()
+    print_run_summary()
+
+def _flag_value(name):
+    if name in sys.argv:
+        i = sys.argv.index(name)
+        if i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+    return None
 
 if __name__ == "__main__":
-    main()
+    # --sink mysql|sqlite|jsonl|null and --sink-path override ocr_config
+    for flag, key in (("--sink", "sink"), ("--sink-path", "sink_path")):
+        if _flag_value(flag) is not None:
+            ocr_config[key] = _flag_value(flag)
+    if "--reparse" in sys.argv:
+        reparse_all()
+    elif "--repair" in sys.argv:
+        repair_needs_review()
+        shutdown_pool()
+        print_run_summary()
+    else:
+        main("--pipeline" in sys.argv, [a for a in sys.argv[1:] if is_archive(a)])
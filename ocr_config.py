@@ -0,0 +1,222 @@
+# ocr_config.py
+import json
+import os
+
+config_path = os.environ.get("OCR_CONFIG", "ocr_config.json")
+
+defaults = {
+    "text_backend": "auto",
+    # where ingestion writes: mysql, sqlite, jsonl (append-only, bulk-load
+    # later with sinks.py) or null (nothing, to time extraction alone);
+    # sink_path is the SQLite or JSONL file
+    "sink": "mysql",
+    "sink_path": "",
+    "embedded_images": True,
+    # pages that would render above max_page_pixels are rendered at a lower
+    # DPI (not below min_dpi), tiled into strips, or skipped, per policy
+    "oversized_pages": {
+        "max_page_pixels": 40_000_000,
+        "policy": "tile",
+        "min_dpi": 100,
+        "max_tiles": 12,
+        "tile_overlap_pt": 24,
+    },
+    # rendered grayscale pages kept on disk as .npy, keyed by file hash, page
+    # and DPI; once past max_mb the least recently used are evicted down to
+    # evict_to of it. A page cached at a higher DPI serves lower-DPI requests
+    "page_cache": {
+        "enabled": True,
+        "dir": "page_cache",
+        "max_mb": 2048,
+        "evict_to": 0.9,
+    },
+    # staged ingestion (also ocr_and_extract.py --pipeline): at most
+    # prefetch_batches rendered batches wait ahead of OCR, and a full store
+    # queue holds back everything upstream
+    "pipeline": {
+        "enabled": False,
+        "prefetch_batches": 2,
+        "parse_queue": 4,
+        "store_queue": 8,
+        "report_s": 30,
+    },
+    # phase 1 OCRs only until API, name and coordinates are found and inserts
+    # the well; the remaining pages are OCR'd by a background thread with
+    # tesseract run at this nice level
+    "two_phase": {
+        "enabled": True,
+        "nice": 10,
+    },
+    # needs_review repair: every page is read at scan_dpi (or from the text
+    # layer) to find the pages most likely to hold the missing field, then
+    # the top_pages are OCR'd again with that field's DPI and tesseract options
+    "repair": {
+        "scan_dpi": 100,
+        "top_pages": 3,
+        "fields": {
+            "coordinates": {"dpi": 300, "tesseract": "--psm 6 -c preserve_interword_spaces=1"},
+            "well_name": {"dpi": 300, "tesseract": "--psm 4"},
+        },
+    },
+    # POST /api/ingest: uploads over max_mb are refused; workers threads ingest
+    # uploads, each with its own DB connection; finished jobs beyond keep_jobs
+    # are forgotten
+    "uploads": {
+        "workers": 1,
+        "max_mb": 512,
+        "keep_jobs": 500,
+    },
+    # ZIP/TAR bundles are read in place: each PDF member is copied to a temp
+    # file under tmp_dir (system temp if empty; a tmpfs keeps them in RAM),
+    # at most max_pending ahead of phase 1; copies kept for background OCR
+    # count toward max_held files and max_held_mb on disk (0: no limit);
+    # members over max_member_mb are skipped
+    "archives": {
+        "tmp_dir": "",
+        "max_pending": 2,
+        "max_held": 16,
+        "max_held_mb": 4096,
+        "max_member_mb": 1024,
+    },
+    # multi-node ingestion through the ingest_jobs table: a claimed job is
+    # leased for lease_s and renewed by heartbeats; an expired lease makes it
+    # claimable again until max_attempts
+    "job_queue": {
+        "lease_s": 300,
+        "poll_s": 10,
+        "max_attempts": 3,
+    },
+    # files are pre-scanned and run cheapest first, with one expensive file
+    # let in after every interleave_every cheap ones
+    "scheduling": {
+        "enabled": True,
+        "sample_pages": 8,
+        "text_chars": 200,
+        "text_page_s": 0.01,
+        "ocr_s_per_mp": 0.4,
+        "heavy_factor": 10,
+        "interleave_every": 5,
+    },
+    # preprocessing per page class: "scan" pages were decoded from an embedded
+    # image, "render" pages were rasterized by poppler; {} sends the page as is
+    "prep_profiles": {
+        "scan": {"binarize": True, "despeckle": True, "deskew": True, "crop": True},
+        "render": {"binarize": True, "despeckle": False, "deskew": True, "crop": True},
+    },
+    # pages classified as blank / photo / no_text skip tesseract
+    "skip_textless_pages": True,
+    "page_profile": {
+        "blank_ink_ratio": 0.002,
+        "min_components": 20,
+        "min_text_lines": 2,
+        "photo_ink_ratio": 0.25,
+    },
+    # ingestion defaults, normally written by tune_ocr.py --save;
+    # omp_thread_limit 0 leaves tesseract's OpenMP threads alone
+    "ocr_dpi": 225,
+    "batch_size": 12,
+    "omp_thread_limit": 0,
+    # batches and pages in flight are sized to keep this process and its
+    # workers under budget_mb (0: 80% of RAM) and reserve_mb of RAM free
+    "memory": {
+        "enabled": True,
+        "budget_mb": 0,
+        "reserve_mb": 512,
+        "min_batch": 1,
+    },
+    # tesseract processes; above 1, pages reach them through shared memory
+    # slots instead of being pickled
+    "ocr_workers": 1,
+    "transport": {
+        "slots_per_worker": 2,
+        "slot_mb": 48,
+    },
+    # tesseract is killed after page_timeout_s and the page retried once at
+    # retry_scale of its resolution; a document stops OCR after
+    # document_budget_s (0 disables either limit)
+    "ocr_watchdog": {
+        "page_timeout_s": 120,
+        "retry_scale": 0.6,
+        "document_budget_s": 1800,
+        "report_slowest": 10,
+    },
+    # pages whose row/column profile ratio is below upright_ratio are checked
+    # with tesseract OSD on a copy scaled to osd_max_side; a sideways page OSD
+    # cannot read is OCR'd turned both ways, and turned only when one reads
+    # sideways_margin times better than the other
+    "orientation": {
+        "enabled": True,
+        "upright_ratio": 1.3,
+        "osd_max_side": 1200,
+        "min_confidence": 2.0,
+        "sideways_margin": 1.5,
+        "cache_size": 10000,
+    },
+    # learned library of pages that recur unchanged across documents; pages
+    # match within max_distance hash bits and max_coverage_diff relative
+    # difference in ink coverage
+    "boilerplate": {
+        "enabled": True,
+        "library_path": "boilerplate_pages.json",
+        "max_distance": 12,
+        "max_coverage_diff": 0.05,
+        "min_docs": 3,
+        "min_word_overlap": 0.9,
+        "max_entries": 5000,
+    },
+}
+
+def _cast(default, value):
+    if isinstance(default, (dict, list)):
+        return json.loads(value)
+    if isinstance(default, bool):
+        return value.lower() in ("1", "true", "yes", "on")
+    if isinstance(default, (int, float)):
+        return type(default)(value)
+    return value
+
+# sections whose value replaces the default as a whole: a prep profile of {}
+# means "send the page as is", and repair fields are keyed by field name
+replaced = {"prep_profiles.scan", "prep_profiles.render", "repair.fields"}
+
+def _merge(default, value, name):
+    # nested sections are merged key by key onto the defaults, so a file
+    # setting only pipeline.enabled keeps the other pipeline settings
+    if not isinstance(default, dict) or name in replaced:
+        return value
+    if not isinstance(value, dict):
+        raise ValueError(f"ocr config: {name} must be an object")
+    unknown = sorted(set(value) - set(default))
+    if unknown:
+        raise ValueError(f"ocr config: unknown key(s) {', '.join(f'{name}.{k}' for k in unknown)}")
+    return {key: _merge(default[key], value[key], f"{name}.{key}") if key in value else default[key]
+            for key in default}
+
+def load_config(path=config_path):
+    cfg = json.loads(json.dumps(defaults))
+    if os.path.exists(path):
+        with open(path) as f:
+            loaded = json.load(f)
+        unknown = sorted(set(loaded) - set(defaults))
+        if unknown:
+            raise ValueError(f"ocr config: unknown key(s) {', '.join(unknown)} in {path}")
+        for key, value in loaded.items():
+            cfg[key] = _merge(cfg[key], value, key)
+    for key in defaults:
+        env = os.environ.get("OCR_" + key.upper())
+        if env is not None:
+            cfg[key] = _merge(cfg[key], _cast(defaults[key], env), key)
+    return cfg
+
+def save_config(updates, path=config_path):
+    cfg = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            cfg = json.load(f)
+    cfg.update(updates)
+    with open(path, "w") as f:
+        json.dump(cfg, f, indent=2, sort_keys=True)
+    for key, value in updates.items():
+        ocr_config[key] = _merge(ocr_config[key], value, key)
+
+ocr_config = load_config()
@@ -0,0 +1,198 @@
+# ocr_worker.py
+import multiprocessing as mp
+from collections import deque
+import os
+import threading
+import time
+
+import pytesseract
+from PIL import Image
+
+from ocr_config import ocr_config
+from page_transport import PageSlabs, attach_reader, read_page, release_page
+from stim_table import is_stim_page, extract_stim_table
+
+_pool = None
+_slabs = None
+_pool_workers = 0
+_pool_users = 0
+_pool_lock = threading.Lock()
+
+def _timed_out(e: RuntimeError) -> bool:
+    return "timeout" in str(e).lower()
+
+def _lower_resolution(img):
+    scale = ocr_config["ocr_watchdog"]["retry_scale"]
+    size = (max(1, int(img.width * scale)), max(1, int(img.height * scale)))
+    return img.convert("L").resize(size, Image.BOX)
+
+def _page_timeout(timeout, deadline):
+    # tesseract's timeout, cut to what is left of the document budget; None
+    # once the budget is used up
+    if deadline is None:
+        return timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return None
+    remaining = max(1, int(remaining))
+    return min(timeout, remaining) if timeout else remaining
+
+def _data_text(data):
+    # rebuilds image_to_string's layout from image_to_data: words joined by
+    # spaces, a line per (block, par, line), a blank line between paragraphs
+    lines = []
+    prev = None
+    for i, word in enumerate(data["text"]):
+        word = str(word).strip()
+        if data["level"][i] != 5 or not word:
+            continue
+        key = (data["page_num"][i], data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        if key == prev:
+            lines[-1].append(word)
+            continue
+        if prev is not None and key[:3] != prev[:3]:
+            lines.append([])
+        lines.append([word])
+        prev = key
+    return "\n".join(" ".join(words) for words in lines)
+
+def _read_page(img, config, timeout, nice):
+    # one tesseract run gives both the text and, for stimulation pages, the
+    # word boxes the table is read from
+    data = pytesseract.image_to_data(img, config=config, output_type=pytesseract.Output.DICT,
+                                     timeout=timeout, nice=nice)
+    text = _data_text(data)
+    return text, extract_stim_table(data) if is_stim_page(text) else []
+
+def ocr_page(img, timeout=0, nice=0, config="--psm 6", deadline=None):
+    # returns (text, stim rows, seconds, status); status is "ok", "retried"
+    # (timed out, then read at lower resolution), "timeout" (given up) or
+    # "over_budget" (the document's deadline passed before it was read).
+    # deadline is a time.monotonic() value, which worker processes share
+    start = time.perf_counter()
+    status = "ok"
+    page_timeout = _page_timeout(timeout, deadline)
+    if page_timeout is None:
+        return "", [], 0.0, "over_budget"
+    try:
+        text, rows = _read_page(img, config, page_timeout, nice)
+    except RuntimeError as e:
+        if not _timed_out(e):
+            raise
+        page_timeout = _page_timeout(timeout, deadline)
+        if page_timeout is None:
+            return "", [], time.perf_counter() - start, "timeout"
+        img = _lower_resolution(img)
+        try:
+            text, rows = _read_page(img, config, page_timeout, nice)
+            status = "retried"
+        except RuntimeError as e:
+            if not _timed_out(e):
+                raise
+            return "", [], time.perf_counter() - start, "timeout"
+    return text, rows, time.perf_counter() - start, status
+
+def _ocr_shared(desc, timeout, nice, config, deadline):
+    img = read_page(desc)
+    try:
+        return ocr_page(img, timeout, nice, config, deadline)
+    finally:
+        del img
+        release_page(desc)
+
+def _apply_thread_limit():
+    # tesseract reads OMP_THREAD_LIMIT from the environment it inherits; with
+    # several workers an unlimited OpenMP pool per process oversubscribes cores
+    limit = ocr_config["omp_thread_limit"]
+    if limit:
+        os.environ["OMP_THREAD_LIMIT"] = str(limit)
+
+def _init_worker(config, shm_name, free_queue, slot_bytes):
+    # workers start from a clean interpreter, so they take the parent's
+    # settings as they are now (tune_ocr changes them between runs)
+    ocr_config.clear()
+    ocr_config.update(config)
+    _apply_thread_limit()
+    attach_reader(shm_name, free_queue, slot_bytes)
+
+def _close_pool():
+    global _pool, _slabs
+    if _pool is not None:
+        _pool.close()
+        _pool.join()
+        _slabs.close()
+        _pool = None
+        _slabs = None
+
+def _get_pool(workers):
+    # the pool is rebuilt at a new size (the memory governor shrinks it when
+    # headroom is short) only while no other thread has pages with it
+    global _pool, _slabs, _pool_workers, _pool_users
+    with _pool_lock:
+        if _pool is not None and workers != _pool_workers and not _pool_users:
+            _close_pool()
+        if _pool is None:
+            # the pool is first needed from pipeline, completion, archive and
+            # upload threads, and fork() from a threaded process can leave the
+            # child stuck on a lock another thread held; the fork server is a
+            # single-threaded process started with exec, so workers forked
+            # from it are safe, and it imports this module only once
+            ctx = mp.get_context("forkserver")
+            ctx.set_forkserver_preload(["ocr_worker"])
+            _slabs = PageSlabs(ctx, workers * ocr_config["transport"]["slots_per_worker"],
+                               ocr_config["transport"]["slot_mb"] * 1024 * 1024)
+            _pool = ctx.Pool(workers, initializer=_init_worker,
+                             initargs=(dict(ocr_config), _slabs.shm.name, _slabs.free, _slabs.slot_bytes))
+            _pool_workers = workers
+        _pool_users += 1
+        return _pool, _slabs
+
+def _release_pool():
+    global _pool_users
+    with _pool_lock:
+        _pool_users -= 1
+
+def _over_budget(deadline):
+    return deadline is not None and time.monotonic() >= deadline
+
+def ocr_pages(images, timeout=0, nice=0, config="--psm 6", max_in_flight=None, on_page=None, deadline=None,
+              workers=None):
+    # on_page(index) is called as each page's result comes in, in page order.
+    # Pages not yet handed to tesseract when deadline passes come back as
+    # "over_budget" without being read. workers sizes the pool when
+    # ocr_workers is above 1 (default ocr_workers)
+    _apply_thread_limit()
+    results = []
+    skipped = ("", [], 0.0, "over_budget")
+
+    def collect(result):
+        results.append(result)
+        if on_page is not None:
+            on_page(len(results) - 1)
+
+    if ocr_config["ocr_workers"] <= 1:
+        for img in images:
+            collect(ocr_page(img, timeout, nice, config, deadline))
+        return results
+    pool, slabs = _get_pool(workers or ocr_config["ocr_workers"])
+    try:
+        pending = deque()
+        for img in images:
+            if max_in_flight and len(pending) >= max_in_flight:
+                result = pending.popleft()
+                collect(result if isinstance(result, tuple) else result.get())
+            if _over_budget(deadline):
+                pending.append(skipped)
+            elif slabs.fits(img):
+                pending.append(pool.apply_async(_ocr_shared, (slabs.put(img), timeout, nice, config, deadline)))
+            else:
+                pending.append(pool.apply_async(ocr_page, (img, timeout, nice, config, deadline)))
+        for result in pending:
+            collect(result if isinstance(result, tuple) else result.get())
+    finally:
+        _release_pool()
+    return results
+
+def shutdown_pool():
+    with _pool_lock:
+        _close_pool()
@@ -0,0 +1,129 @@
+# page_cache.py
+import os
+import threading
+import uuid
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from ocr_config import ocr_config
+
+def _path(file_hash: str, page: int, dpi: int) -> str:
+    return os.path.join(ocr_config["page_cache"]["dir"], f"{file_hash}_{page}_{dpi}.npy")
+
+def cache_enabled(file_hash: Optional[str]) -> bool:
+    return bool(file_hash) and ocr_config["page_cache"]["enabled"]
+
+# what this process knows is on disk: total bytes and the DPIs cached per
+# (file hash, page), read from the directory once and kept up to date by
+# put_page, so a write only scans the directory when it crosses max_mb
+_index = {"total": None, "dpis": {}}
+_index_lock = threading.Lock()
+
+def _scan():
+    directory = ocr_config["page_cache"]["dir"]
+    entries = []
+    try:
+        with os.scandir(directory) as it:
+            for e in it:
+                if e.name.endswith(".npy") and not e.name.startswith("."):
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, e.path))
+    except FileNotFoundError:
+        pass
+    return entries
+
+def _reindex(entries):
+    dpis = {}
+    for _, _, path in entries:
+        try:
+            file_hash, page, dpi = os.path.basename(path)[:-4].rsplit("_", 2)
+            dpis.setdefault((file_hash, int(page)), set()).add(int(dpi))
+        except ValueError:
+            continue
+    _index["total"] = sum(size for _, size, _ in entries)
+    _index["dpis"] = dpis
+
+def _ensure_index():
+    if _index["total"] is None:
+        _reindex(_scan())
+
+def _load(path: str) -> Optional[Image.Image]:
+    try:
+        arr = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    # mtime doubles as the LRU clock
+    os.utime(path)
+    return Image.fromarray(arr)
+
+def get_page(file_hash: str, page: int, dpi: int) -> Optional[Image.Image]:
+    # a page cached at a higher DPI is scaled down rather than rendered again,
+    # so repair's scan_dpi reuses the rasters ingestion left at ocr_dpi
+    img = _load(_path(file_hash, page, dpi))
+    if img is not None:
+        return img
+    with _index_lock:
+        _ensure_index()
+        higher = sorted(d for d in _index["dpis"].get((file_hash, page), ()) if d > dpi)
+    for cached_dpi in higher:
+        img = _load(_path(file_hash, page, cached_dpi))
+        if img is None:
+            with _index_lock:
+                _index["dpis"].get((file_hash, page), set()).discard(cached_dpi)
+            continue
+        scale = dpi / cached_dpi
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        return img.resize(size, Image.BOX)
+    return None
+
+def put_page(file_hash: str, page: int, dpi: int, img: Image.Image) -> Image.Image:
+    # stores the page as 8-bit gray and returns that gray image, so cached and
+    # freshly rendered pages look the same to the rest of the pipeline
+    gray = img if img.mode == "L" else img.convert("L")
+    directory = ocr_config["page_cache"]["dir"]
+    os.makedirs(directory, exist_ok=True)
+    path = _path(file_hash, page, dpi)
+    tmp = os.path.join(directory, f".{uuid.uuid4().hex}.tmp.npy")
+    try:
+        np.save(tmp, np.asarray(gray))
+        size = os.path.getsize(tmp)
+        replaced = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Page cache write failed: {e}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return gray
+    with _index_lock:
+        _ensure_index()
+        _index["total"] += size - replaced
+        _index["dpis"].setdefault((file_hash, page), set()).add(dpi)
+        full = _index["total"] > ocr_config["page_cache"]["max_mb"] * 1024 * 1024
+    if full:
+        evict(ocr_config["page_cache"]["max_mb"] * ocr_config["page_cache"]["evict_to"])
+    return gray
+
+def evict(max_mb: Optional[float] = None):
+    # rescans the directory (other processes may share it) and removes the
+    # least recently used pages until it is under max_mb
+    limit = (ocr_config["page_cache"]["max_mb"] if max_mb is None else max_mb) * 1024 * 1024
+    with _index_lock:
+        entries = sorted(_scan())
+        total = sum(size for _, size, _ in entries)
+        kept = []
+        for mtime, size, path in entries:
+            if total > limit:
+                try:
+                    # readers holding a memmap keep their data until they let go of it
+                    os.remove(path)
+                    total -= size
+                    continue
+                except OSError:
+                    pass
+            kept.append((mtime, size, path))
+        _reindex(kept)
@@ -0,0 +1,128 @@
+# page_fingerprint.py
+import json
+import os
+import re
+import threading
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from ocr_config import ocr_config
+
+hash_size = 16
+hash_bytes = hash_size * hash_size // 8
+thumb_size = 64
+popcount = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+_k = np.arange(thumb_size)
+dct_basis = np.cos(np.pi * (2 * _k[None, :] + 1) * _k[:hash_size, None] / (2 * thumb_size)).astype(np.float32)
+
+def page_fingerprint(img: Image.Image) -> np.ndarray:
+    # perceptual hash: signs of the low-frequency DCT coefficients of a small
+    # thumbnail, followed by the ink coverage in per mille (two bytes, big
+    # endian) so a filled-in copy of a blank form does not pass for the blank
+    # one; the hash alone barely changes when values are written in
+    gray = img.convert("L").resize((thumb_size, thumb_size), Image.BOX)
+    thumb = np.asarray(gray, dtype=np.float32)
+    coeffs = dct_basis @ thumb @ dct_basis.T
+    bits = (coeffs > np.median(coeffs.ravel()[1:])).ravel()
+    coverage = int(round(1000 * (255.0 - thumb.mean()) / 255.0))
+    return np.concatenate([np.packbits(bits), divmod(coverage, 256)]).astype(np.uint8)
+
+def coverage_per_mille(fps: np.ndarray) -> np.ndarray:
+    # ink coverage of one fingerprint or a stack of them
+    return fps[..., hash_bytes].astype(np.int32) * 256 + fps[..., hash_bytes + 1]
+
+def fingerprint_hex(fp: np.ndarray) -> str:
+    return fp.tobytes().hex()
+
+def _words(text: str) -> set:
+    return set(re.findall(r'[a-z0-9]{2,}', (text or '').lower()))
+
+class BoilerplateLibrary:
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = []
+        self.hashes = np.zeros((0, hash_bytes + 2), dtype=np.uint8)
+        self.dirty = False
+        # ingestion and the background completion pass share one library
+        self.lock = threading.RLock()
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f).get("pages", [])
+            # libraries written with the old one-byte coverage are relearned
+            kept = [e for e in self.entries if len(e["hash"]) == 2 * (hash_bytes + 2)]
+            if len(kept) < len(self.entries):
+                print(f"Dropped {len(self.entries) - len(kept)} boilerplate entries in an old format")
+                self.entries = kept
+                self.dirty = True
+            if self.entries:
+                self.hashes = np.array([bytearray.fromhex(e["hash"]) for e in self.entries], dtype=np.uint8)
+
+    def _nearest(self, fp: np.ndarray) -> Optional[int]:
+        if not len(self.hashes):
+            return None
+        cfg = ocr_config["boilerplate"]
+        dist = popcount[self.hashes[:, :hash_bytes] ^ fp[:hash_bytes]].sum(axis=1)
+        # relative difference, so a dense form filled in is told from its
+        # blank copy as well as a sparse one is
+        known = coverage_per_mille(self.hashes)
+        coverage = int(coverage_per_mille(fp))
+        coverage_diff = np.abs(known - coverage) / np.maximum(np.maximum(known, coverage), 1)
+        dist[coverage_diff > cfg["max_coverage_diff"]] = np.iinfo(dist.dtype).max
+        i = int(dist.argmin())
+        return i if dist[i] <= cfg["max_distance"] else None
+
+    def is_boilerplate(self, fp: np.ndarray) -> bool:
+        with self.lock:
+            i = self._nearest(fp)
+            return i is not None and self.entries[i]["boilerplate"]
+
+    def observe(self, fp: np.ndarray, text: str, doc: str):
+        # a page is learned as boilerplate once it has turned up with the same
+        # words in enough different documents; a filled-in form carries more
+        # ink than its blank copy and differs from other fillings in its
+        # values, which keeps it apart from both
+        with self.lock:
+            cfg = ocr_config["boilerplate"]
+            words = _words(text)
+            i = self._nearest(fp)
+            if i is None:
+                self.entries.append({"hash": fingerprint_hex(fp), "words": sorted(words), "docs": [doc], "boilerplate": False})
+                self.hashes = np.vstack([self.hashes, fp[None, :]])
+                if len(self.entries) > cfg["max_entries"]:
+                    # forget the oldest page that has only been seen once
+                    stale = next((j for j, e in enumerate(self.entries) if not e["boilerplate"] and len(e["docs"]) == 1), None)
+                    if stale is not None:
+                        del self.entries[stale]
+                        self.hashes = np.delete(self.hashes, stale, axis=0)
+                self.dirty = True
+                return
+            entry = self.entries[i]
+            if entry["boilerplate"] or doc in entry["docs"]:
+                return
+            known = set(entry["words"])
+            union = known | words
+            if union and len(known & words) / len(union) >= cfg["min_word_overlap"]:
+                entry["docs"].append(doc)
+                if len(entry["docs"]) >= cfg["min_docs"]:
+                    entry["boilerplate"] = True
+                    print(f"Learned boilerplate page ({len(entry['docs'])} documents)")
+                self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            with open(self.path, "w") as f:
+                json.dump({"pages": self.entries}, f)
+            self.dirty = False
+
+_library = None
+
+def boilerplate_library() -> BoilerplateLibrary:
+    global _library
+    if _library is None:
+        _library = BoilerplateLibrary(ocr_config["boilerplate"]["library_path"])
+    return _library
@@ -0,0 +1,212 @@
+# page_images.py
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+import pikepdf
+from pdf2image import convert_from_path
+from PIL import Image
+
+from ocr_config import ocr_config
+from page_cache import cache_enabled, get_page, put_page
+
+paint_ops = {"S", "s", "f", "F", "f*", "B", "B*", "b", "b*", "sh"}
+text_ops = {"Tj", "TJ", "'", '"'}
+
+def _page_runs(pages: List[int]):
+    runs = []
+    for n in pages:
+        if runs and runs[-1][1] == n - 1:
+            runs[-1][1] = n
+        else:
+            runs.append([n, n])
+    return runs
+
+def _single_image_placement(page) -> bool:
+    # a pure scan page draws exactly one image scaled to the page, and at
+    # most an invisible (render mode 3) OCR text layer on top
+    box = [float(v) for v in page.mediabox]
+    width, height = box[2] - box[0], box[3] - box[1]
+    draws = 0
+    matrix = None
+    invisible_text = False
+    visible_text = False
+    for operands, op in pikepdf.parse_content_stream(page):
+        op = str(op)
+        if op == "cm":
+            matrix = [float(v) for v in operands]
+        elif op == "Do":
+            draws += 1
+            if draws > 1 or matrix is None:
+                return False
+            a, b, c, d = matrix[:4]
+            if b or c or a <= 0 or d <= 0:
+                return False
+            if abs(a - width) > 0.05 * width or abs(d - height) > 0.05 * height:
+                return False
+        elif op in paint_ops:
+            return False
+        elif op == "Tr":
+            invisible_text = int(operands[0]) == 3
+        elif op in text_ops and not invisible_text:
+            visible_text = True
+    return draws == 1 and not visible_text
+
+def extract_scan_image(page, max_pixels: Optional[int] = None) -> Optional[Image.Image]:
+    images = list(page.images.values())
+    if len(images) != 1:
+        return None
+    xobj = images[0]
+    if max_pixels and int(xobj.get("/Width", 0)) * int(xobj.get("/Height", 0)) > max_pixels:
+        return None
+    if xobj.get("/SMask") is not None or xobj.get("/ImageMask"):
+        return None
+    if not _single_image_placement(page):
+        return None
+
+    # pikepdf applies /Decode (e.g. [1 0] on inverted 1-bit scans) itself
+    img = pikepdf.PdfImage(xobj).as_pil_image()
+    if img.mode not in ("1", "L", "RGB"):
+        img = img.convert("RGB")
+
+    rotate = int(page.obj.get("/Rotate", 0)) % 360
+    if rotate:
+        img = img.rotate(-rotate, expand=True)
+    return img
+
+def _page_size_points(page) -> Tuple[float, float]:
+    box = [float(v) for v in page.cropbox]
+    return abs(box[2] - box[0]), abs(box[3] - box[1])
+
+def plan_page(width_pt: float, height_pt: float, dpi: int) -> Tuple[str, int, int]:
+    # returns (action, dpi, tiles) keeping every rendered bitmap under the pixel budget
+    cfg = ocr_config["oversized_pages"]
+    budget = cfg["max_page_pixels"]
+    pixels = (width_pt / 72.0 * dpi) * (height_pt / 72.0 * dpi)
+    if pixels <= budget:
+        return "render", dpi, 1
+    reduced = int(dpi * math.sqrt(budget / pixels))
+    if reduced >= cfg["min_dpi"] and cfg["policy"] in ("downscale", "tile"):
+        return "downscale", reduced, 1
+    if cfg["policy"] == "tile":
+        tile_dpi = cfg["min_dpi"]
+        tiles = math.ceil((width_pt / 72.0 * tile_dpi) * (height_pt / 72.0 * tile_dpi) / budget)
+        if tiles <= cfg["max_tiles"]:
+            return "tile", tile_dpi, tiles
+    return "skip", 0, 0
+
+def render_tiles(filepath: str, page_number: int, dpi: int, tiles: int) -> List[Image.Image]:
+    # strips across the long side with a little overlap so no text line is cut in half
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(filepath)
+    try:
+        page = pdf[page_number - 1]
+        width, height = page.get_size()
+        overlap = ocr_config["oversized_pages"]["tile_overlap_pt"]
+        long_side = height if height >= width else width
+        step = long_side / tiles
+        out = []
+        for i in range(tiles):
+            lo = max(0.0, i * step - overlap)
+            hi = min(long_side, (i + 1) * step + overlap)
+            if height >= width:
+                # pdfium crops are (left, bottom, right, top); start from the top
+                crop = (0, long_side - hi, 0, lo)
+            else:
+                crop = (lo, 0, long_side - hi, 0)
+            img = page.render(scale=dpi / 72.0, crop=crop, grayscale=True).to_pil()
+            img.info["tile"] = (i + 1, tiles)
+            out.append(img)
+        page.close()
+        return out
+    finally:
+        pdf.close()
+
+# raised for pages the document does not have, rather than returning fewer images
+class PageRangeError(ValueError):
+    pass
+
+def page_count(filepath: str) -> int:
+    with pikepdf.open(filepath) as pdf:
+        return len(pdf.pages)
+
+def load_page_images(filepath: str, first_page: int, last_page: int, dpi: int, stats=None,
+                     file_hash: Optional[str] = None) -> List[Image.Image]:
+    images: Dict[int, List[Image.Image]] = {}
+    plans: Dict[int, Tuple[str, int, int]] = {}
+    budget = ocr_config["oversized_pages"]["max_page_pixels"]
+    try:
+        with pikepdf.open(filepath) as pdf:
+            if not 1 <= first_page <= last_page <= len(pdf.pages):
+                raise PageRangeError(f"pages {first_page}-{last_page} are out of range, "
+                                     f"{os.path.basename(filepath)} has {len(pdf.pages)} pages")
+            for n in range(first_page, last_page + 1):
+                page = pdf.pages[n - 1]
+                plans[n] = plan_page(*_page_size_points(page), dpi)
+                if plans[n][0] == "skip" or not ocr_config["embedded_images"]:
+                    continue
+                try:
+                    img = extract_scan_image(page, budget)
+                except Exception as e:
+                    print(f"Embedded image extraction failed on page {n}: {e}")
+                    img = None
+                if img is not None:
+                    img.load()
+                    img.info["page_class"] = "scan"
+                    images[n] = [img]
+    except PageRangeError:
+        raise
+    except Exception as e:
+        print(f"Could not inspect page images: {e}")
+
+    embedded = len(images)
+    missing = [n for n in range(first_page, last_page + 1) if n not in images]
+    normal = [n for n in missing if plans.get(n, ("render",))[0] == "render"]
+    cached = 0
+    if cache_enabled(file_hash):
+        for n in normal:
+            img = get_page(file_hash, n, dpi)
+            if img is not None:
+                img.info["page_class"] = "render"
+                images[n] = [img]
+                cached += 1
+        if stats is not None:
+            stats["pages_cache_hit"] += cached
+    for start, end in _page_runs([n for n in normal if n not in images]):
+        rendered = convert_from_path(filepath, dpi=dpi, first_page=start, last_page=end)
+        for n, img in zip(range(start, end + 1), rendered):
+            if cache_enabled(file_hash):
+                img = put_page(file_hash, n, dpi, img)
+            img.info["page_class"] = "render"
+            images[n] = [img]
+
+    for n in missing:
+        if n in images:
+            continue
+        action, page_dpi, tiles = plans[n]
+        if stats is not None:
+            stats[f"pages_oversized_{action}"] += 1
+        if action == "skip":
+            print(f"Page {n}: oversized, skipped by policy")
+            continue
+        print(f"Page {n}: oversized, {action} at {page_dpi} DPI" + (f" in {tiles} tiles" if tiles > 1 else ""))
+        if action == "downscale":
+            img = get_page(file_hash, n, page_dpi) if cache_enabled(file_hash) else None
+            if img is None:
+                img = convert_from_path(filepath, dpi=page_dpi, first_page=n, last_page=n)[0]
+                if cache_enabled(file_hash):
+                    img = put_page(file_hash, n, page_dpi, img)
+            rendered = [img]
+        else:
+            rendered = render_tiles(filepath, n, page_dpi, tiles)
+        for img in rendered:
+            img.info["page_class"] = "render"
+        images[n] = rendered
+
+    if embedded or cached:
+        print(f"Pages {first_page}-{last_page}: {embedded} embedded scans, {cached} cached, "
+              f"{len(missing) - cached} rendered")
+    for n, page_images in images.items():
+        for img in page_images:
+            img.info["page"] = n
+    return [img for n in range(first_page, last_page + 1) for img in images.get(n, [])]
@@ -0,0 +1,102 @@
+# page_orientation.py
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from ocr_config import ocr_config
+from page_fingerprint import page_fingerprint, fingerprint_hex
+from page_profile import page_ink
+
+_rotation_cache = OrderedDict()
+_cache_lock = threading.Lock()
+# clockwise correction -> PIL transpose (PIL's ROTATE_* turn counter-clockwise)
+_transposes = {
+    90: Image.Transpose.ROTATE_270,
+    180: Image.Transpose.ROTATE_180,
+    270: Image.Transpose.ROTATE_90,
+}
+
+def _profile_ratio(ink: np.ndarray) -> float:
+    # inside the inked area horizontal text gives a row profile that swings
+    # between lines and gaps, while the column profile stays fairly flat
+    rows = np.flatnonzero(ink.any(axis=1))
+    cols = np.flatnonzero(ink.any(axis=0))
+    if len(rows) < 2 or len(cols) < 2:
+        return 1.0
+    box = ink[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+    row_p = box.mean(axis=1)
+    col_p = box.mean(axis=0)
+    row_cv = row_p.std() / row_p.mean()
+    col_cv = col_p.std() / col_p.mean()
+    return float(row_cv / max(col_cv, 1e-6))
+
+def _small_copy(img: Image.Image) -> Image.Image:
+    small = img.convert("L")
+    scale = ocr_config["orientation"]["osd_max_side"] / max(small.size)
+    if scale < 1:
+        small = small.resize((int(small.width * scale), int(small.height * scale)), Image.BILINEAR)
+    return small
+
+def _osd_rotation(img: Image.Image) -> int:
+    cfg = ocr_config["orientation"]
+    osd = pytesseract.image_to_osd(_small_copy(img), output_type=pytesseract.Output.DICT)
+    if float(osd.get("orientation_conf", 0)) < cfg["min_confidence"]:
+        return 0
+    return int(osd.get("rotate", 0)) % 360
+
+def _word_score(img: Image.Image) -> float:
+    # summed confidence of the words tesseract reads with some certainty;
+    # text the right way up scores far above the same text upside down
+    data = pytesseract.image_to_data(img, config="--psm 6", output_type=pytesseract.Output.DICT)
+    return sum(float(conf) for word, conf in zip(data["text"], data["conf"])
+               if float(conf) >= 50 and len(str(word).strip()) >= 2)
+
+def _sideways_rotation(img: Image.Image) -> int:
+    # the profile only says the text runs vertically; reading the page both
+    # ways tells 90 from 270, and a page neither way reads clearly is left alone
+    cfg = ocr_config["orientation"]
+    small = _small_copy(img)
+    scores = {rotation: _word_score(small.transpose(_transposes[rotation])) for rotation in (90, 270)}
+    best = max(scores, key=scores.get)
+    other = scores[360 - best]
+    if scores[best] > 0 and scores[best] >= cfg["sideways_margin"] * other:
+        return best
+    return 0
+
+def detect_rotation(img: Image.Image) -> int:
+    cfg = ocr_config["orientation"]
+    ratio = _profile_ratio(page_ink(img))
+    if ratio >= cfg["upright_ratio"]:
+        return 0
+    try:
+        return _osd_rotation(img)
+    except Exception:
+        # OSD gives up on sparse pages; the profile can still tell sideways text
+        if ratio > 1.0 / cfg["upright_ratio"]:
+            return 0
+    try:
+        return _sideways_rotation(img)
+    except Exception:
+        return 0
+
+def orient_page(img: Image.Image) -> Tuple[Image.Image, int]:
+    key = fingerprint_hex(page_fingerprint(img))
+    with _cache_lock:
+        rotation = _rotation_cache.get(key)
+        if rotation is not None:
+            _rotation_cache.move_to_end(key)
+    if rotation is None:
+        rotation = detect_rotation(img)
+        with _cache_lock:
+            _rotation_cache[key] = rotation
+            if len(_rotation_cache) > ocr_config["orientation"]["cache_size"]:
+                _rotation_cache.popitem(last=False)
+    if rotation in _transposes:
+        info = dict(img.info)
+        img = img.transpose(_transposes[rotation])
+        img.info.update(info)
+    return img, rotation
@@ -0,0 +1,52 @@
+# page_profile.py
+from typing import Dict
+
+import numpy as np
+from PIL import Image
+
+from image_prep import to_gray
+from ocr_config import ocr_config
+
+def page_ink(img: Image.Image) -> np.ndarray:
+    if img.mode == "1":
+        return ~np.asarray(img)
+    return to_gray(img) < 128
+
+def profile_page(ink: np.ndarray) -> Dict[str, float]:
+    h, w = ink.shape
+    if not h or not w:
+        return {"ink_ratio": 0.0, "components": 0.0, "text_lines": 0, "tall_blocks": 0}
+
+    # a pixel with no ink above, left or diagonally above starts a new blob;
+    # cheap stand-in for a connected-component count
+    up = np.zeros_like(ink)
+    up[1:] = ink[:-1]
+    left = np.zeros_like(ink)
+    left[:, 1:] = ink[:, :-1]
+    diag = np.zeros_like(ink)
+    diag[1:, 1:] = ink[:-1, :-1]
+    diag[1:, :-1] |= ink[:-1, 1:]
+    starts = ink & ~up & ~left & ~diag
+
+    # text lines are short runs of inked rows separated by white gaps
+    inked_rows = ink.mean(axis=1) > 0.002
+    edges = np.diff(np.concatenate(([0], inked_rows.astype(np.int8), [0])))
+    run_len = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    line_like = (run_len >= 0.003 * h) & (run_len <= 0.03 * h)
+
+    return {
+        "ink_ratio": float(ink.mean()),
+        "components": float(starts.sum()) * 1e6 / (h * w),
+        "text_lines": int(line_like.sum()),
+        "tall_blocks": int((run_len > 0.1 * h).sum()),
+    }
+
+def classify_page(profile: Dict[str, float]) -> str:
+    limits = ocr_config["page_profile"]
+    if profile["ink_ratio"] < limits["blank_ink_ratio"] or profile["components"] < limits["min_components"]:
+        return "blank"
+    if profile["text_lines"] < limits["min_text_lines"]:
+        if profile["ink_ratio"] > limits["photo_ink_ratio"] or profile["tall_blocks"]:
+            return "photo"
+        return "no_text"
+    return "text"
@@ -0,0 +1,40 @@
+# page_targets.py
+import re
+from typing import Dict, List, Optional, Tuple
+
+from parse_utils import is_valid_nd_coordinate
+
+# (pattern, weight) per field; a page's score is the weighted match count
+field_keywords = {
+    "coordinates": [
+        (re.compile(r'\blatitude\b', re.IGNORECASE), 4),
+        (re.compile(r'\blongitude\b', re.IGNORECASE), 4),
+        (re.compile(r'\blat\b|\blong?\b', re.IGNORECASE), 1),
+        (re.compile(r'\b4[5-9]\s*°|\b4[5-9]\.\d{3,}'), 2),
+        (re.compile(r'\b10[0-4]\s*°|-?\b10[0-4]\.\d{3,}'), 2),
+        (re.compile(r'\bfootages?\b|\bqtr-qtr\b|\bsurface hole\b', re.IGNORECASE), 1),
+    ],
+    "well_name": [
+        (re.compile(r'well name', re.IGNORECASE), 4),
+        (re.compile(r'well name and number|well name/number', re.IGNORECASE), 2),
+        (re.compile(r'\boperator\b', re.IGNORECASE), 1),
+        (re.compile(r'\bwell file no', re.IGNORECASE), 1),
+    ],
+}
+
+def missing_fields(well_name: Optional[str], lat: Optional[float], lon: Optional[float]) -> List[str]:
+    # mirrors the needs_review rules in models.WellRecord
+    missing = []
+    if not is_valid_nd_coordinate(lat, lon):
+        missing.append("coordinates")
+    if not well_name or len(well_name) < 3:
+        missing.append("well_name")
+    return missing
+
+def score_page(text: str, field: str) -> int:
+    return sum(weight * len(p.findall(text or "")) for p, weight in field_keywords[field])
+
+def candidate_pages(page_texts: Dict[int, str], field: str, top: int) -> List[Tuple[int, int]]:
+    # (score, page) of the best-scoring pages for a field, best first
+    scored = [(score_page(text, field), page) for page, text in page_texts.items()]
+    return sorted((s for s in scored if s[0] > 0), key=lambda s: (-s[0], s[1]))[:top]
@@ -0,0 +1,61 @@
+# page_transport.py
+from multiprocessing import shared_memory
+from typing import Dict, Tuple
+
+import numpy as np
+from PIL import Image
+
+def encode_page(img: Image.Image) -> Tuple[str, Tuple[int, int], np.ndarray]:
+    # 1-bit pages travel bit-packed; everything else as 8-bit gray, which is
+    # all tesseract uses anyway
+    if img.mode == "1":
+        return "1", img.size, np.packbits(np.asarray(img), axis=1)
+    if img.mode != "L":
+        img = img.convert("L")
+    return "L", img.size, np.asarray(img)
+
+def decode_page(mode: str, size: Tuple[int, int], arr: np.ndarray) -> Image.Image:
+    if mode == "1":
+        return Image.fromarray(np.unpackbits(arr, axis=1, count=size[0]).astype(bool))
+    return Image.fromarray(arr)
+
+class PageSlabs:
+    # fixed-size slots in one shared memory block; the writer takes a free slot
+    # id from the queue and the reader hands it back once it is done
+    def __init__(self, ctx, slots: int, slot_bytes: int):
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.free = ctx.Queue()
+        for i in range(slots):
+            self.free.put(i)
+
+    def fits(self, img: Image.Image) -> bool:
+        w, h = img.size
+        return (h * ((w + 7) // 8) if img.mode == "1" else w * h) <= self.slot_bytes
+
+    def put(self, img: Image.Image) -> Dict:
+        mode, size, arr = encode_page(img)
+        slot = self.free.get()
+        view = np.ndarray(arr.shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+        view[...] = arr
+        return {"slot": slot, "mode": mode, "size": size, "shape": arr.shape}
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+# reader side, set up once per worker process
+_reader = {}
+
+def attach_reader(shm_name: str, free_queue, slot_bytes: int):
+    _reader["shm"] = shared_memory.SharedMemory(name=shm_name)
+    _reader["free"] = free_queue
+    _reader["slot_bytes"] = slot_bytes
+
+def read_page(desc: Dict) -> Image.Image:
+    arr = np.ndarray(desc["shape"], dtype=np.uint8, buffer=_reader["shm"].buf,
+                     offset=desc["slot"] * _reader["slot_bytes"])
+    return decode_page(desc["mode"], desc["size"], arr)
+
+def release_page(desc: Dict):
+    _reader["free"].put(desc["slot"])
@@ -0,0 +1,45 @@
+# pdf_text.py
+from typing import List, Optional, Tuple
+
+backend_order = ["pypdfium2", "pdfminer", "pypdf2"]
+
+def _pypdfium2_pages(path: str) -> List[str]:
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(path)
+    try:
+        pages = []
+        for page in pdf:
+            textpage = page.get_textpage()
+            pages.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+        return pages
+    finally:
+        pdf.close()
+
+def _pdfminer_pages(path: str) -> List[str]:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+    pages = []
+    for layout in extract_pages(path):
+        pages.append(''.join(el.get_text() for el in layout if isinstance(el, LTTextContainer)))
+    return pages
+
+def _pypdf2_pages(path: str) -> List[str]:
+    from PyPDF2 import PdfReader
+    return [page.extract_text() or "" for page in PdfReader(path).pages]
+
+text_backends = {
+    "pypdfium2": _pypdfium2_pages,
+    "pdfminer": _pdfminer_pages,
+    "pypdf2": _pypdf2_pages,
+}
+
+def extract_page_texts(path: str, backend: str = "auto") -> Tuple[Optional[str], List[str]]:
+    names = backend_order if backend == "auto" else [backend]
+    for name in names:
+        try:
+            return name, text_backends[name](path)
+        except Exception as e:
+            print(f"Text backend {name} failed on {path}: {e}")
+    return None, []
@@ -0,0 +1,116 @@
+# pipeline.py
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List
+
+_done = object()
+
+class Stage:
+    # fn takes one item and yields any number of items for the next stage
+    def __init__(self, name: str, fn: Callable, workers: int = 1, queue_size: int = 0):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.inbox = queue.Queue(queue_size)
+        self.queue_size = queue_size
+        self.remaining = workers
+        self.lock = threading.Lock()
+        self.items = 0
+        self.busy_s = 0.0
+        self.max_depth = 0
+        # _done markers sitting in inbox, left out of its depth
+        self.sentinels = 0
+
+    def depth(self) -> int:
+        return max(0, self.inbox.qsize() - self.sentinels)
+
+    def put_done(self):
+        # counted before the put, which may block on a full queue, so the
+        # lock is not held while it waits
+        with self.lock:
+            self.sentinels += 1
+        self.inbox.put(_done)
+
+class Pipeline:
+    # stages connected by bounded queues; a full queue blocks the stage in
+    # front of it, so a slow consumer (usually the DB writer) throttles the
+    # whole chain instead of letting rendered pages pile up
+    def __init__(self, report_s: float = 30):
+        self.stages: List[Stage] = []
+        self.report_s = report_s
+        self.errors = 0
+
+    def stage(self, name: str, fn: Callable, workers: int = 1, queue_size: int = 0) -> "Pipeline":
+        self.stages.append(Stage(name, fn, workers, queue_size))
+        return self
+
+    def depths(self) -> Dict[str, int]:
+        return {s.name: s.depth() for s in self.stages}
+
+    def _worker(self, i: int):
+        stage = self.stages[i]
+        next_stage = self.stages[i + 1] if i + 1 < len(self.stages) else None
+        out = next_stage.inbox if next_stage is not None else None
+        while True:
+            item = stage.inbox.get()
+            if item is _done:
+                with stage.lock:
+                    stage.sentinels -= 1
+                    stage.remaining -= 1
+                    last = stage.remaining == 0
+                if last:
+                    if next_stage is not None:
+                        next_stage.put_done()
+                else:
+                    # let the other workers of this stage see it too
+                    stage.put_done()
+                return
+            with stage.lock:
+                # the item just taken counts, a _done queued behind it does not
+                stage.max_depth = max(stage.max_depth, stage.depth() + 1)
+            start = time.perf_counter()
+            try:
+                for result in stage.fn(item) or ():
+                    if out is not None:
+                        # time spent blocked on a full queue is not work
+                        stage.busy_s += time.perf_counter() - start
+                        out.put(result)
+                        start = time.perf_counter()
+            except Exception as e:
+                self.errors += 1
+                print(f"{stage.name} stage error: {e}")
+            stage.busy_s += time.perf_counter() - start
+            stage.items += 1
+
+    def _report(self, stop: threading.Event):
+        while not stop.wait(self.report_s):
+            print("Queues: " + ", ".join(
+                f"{s.name} {s.depth()}" + (f"/{s.queue_size}" if s.queue_size else "") for s in self.stages
+            ))
+
+    def run(self, items: Iterable) -> Dict[str, Dict]:
+        threads = [
+            threading.Thread(target=self._worker, args=(i,), name=f"{s.name}-{n}", daemon=True)
+            for i, s in enumerate(self.stages) for n in range(s.workers)
+        ]
+        stop = threading.Event()
+        reporter = threading.Thread(target=self._report, args=(stop,), daemon=True)
+        for t in threads:
+            t.start()
+        reporter.start()
+        start = time.perf_counter()
+        for item in items:
+            self.stages[0].inbox.put(item)
+        self.stages[0].put_done()
+        for t in threads:
+            t.join()
+        stop.set()
+        elapsed = time.perf_counter() - start
+
+        print(f"\nPipeline finished in {elapsed:.1f}s ({self.errors} errors)")
+        for s in self.stages:
+            busy = s.busy_s / s.workers
+            print(f"  {s.name:8s} items {s.items:6d}  busy {busy:8.1f}s ({100 * busy / elapsed if elapsed else 0:5.1f}%)  "
+                  f"max queue {s.max_depth}" + (f"/{s.queue_size}" if s.queue_size else ""))
+        return {s.name: {"items": s.items, "busy_s": s.busy_s, "max_depth": s.max_depth} for s in self.stages}
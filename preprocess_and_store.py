@@ -2,12 +2,8 @@
 import re
 import mysql.connector
 from datetime import datetime
-import os
 
-DB_HOST = os.environ.get("DB_HOST", "127.0.0.1")
-DB_USER = os.environ.get("DB_USER", "root")
-DB_PASS = os.environ.get("DB_PASS", "admin123")
-DB_NAME = os.environ.get("DB_NAME", "oil_wells")
+from db_settings import db_config
 
 def clean_text(s):
     if s is None:
@@ -31,7 +27,7 @@ def normalize_coords(lat, lon):
         return None, None
 
 def main():
-    conn = mysql.connector.connect(host=DB_HOST, user=DB_USER, password=DB_PASS, database=DB_NAME)
+    conn = mysql.connector.connect(**db_config)
     cur = conn.cursor(dictionary=True)
     cur.execute("SELECT * FROM wells WHERE (latitude IS NULL OR longitude IS NULL) OR (operator IS NULL)")
     rows = cur.fetchall()
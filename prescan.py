@@ -0,0 +1,81 @@
+# prescan.py
+import os
+import statistics
+from typing import Dict, List
+
+import pikepdf
+
+from ocr_config import ocr_config
+
+def _sample(n: int, k: int) -> List[int]:
+    if n <= k:
+        return list(range(n))
+    return sorted({round(i * (n - 1) / (k - 1)) for i in range(k)})
+
+def prescan(path: str) -> Dict:
+    # page count, text layer coverage and image sizes from a handful of
+    # pages spread through the file, turned into a rough cost in seconds
+    import pypdfium2 as pdfium
+    cfg = ocr_config["scheduling"]
+    dpi = ocr_config["ocr_dpi"]
+    pdf = pdfium.PdfDocument(path)
+    try:
+        pages = len(pdf)
+        sampled = _sample(pages, cfg["sample_pages"])
+        text_pages = 0
+        megapixels = []
+        with pikepdf.open(path) as doc:
+            for i in sampled:
+                page = pdf[i]
+                textpage = page.get_textpage()
+                if textpage.count_chars() >= cfg["text_chars"]:
+                    text_pages += 1
+                width, height = page.get_size()
+                textpage.close()
+                page.close()
+                render = (width / 72.0 * dpi) * (height / 72.0 * dpi)
+                images = [int(x.get("/Width", 0)) * int(x.get("/Height", 0)) for x in doc.pages[i].images.values()]
+                # a page-sized scan is OCR'd at its own resolution, anything
+                # else is rendered at the OCR DPI
+                largest = max(images, default=0)
+                megapixels.append((largest if largest >= render / 4 else render) / 1e6)
+    finally:
+        pdf.close()
+
+    has_text = bool(sampled) and text_pages / len(sampled) >= 0.5
+    if has_text:
+        cost = pages * cfg["text_page_s"]
+    else:
+        cost = pages * statistics.fmean(megapixels or [0.0]) * cfg["ocr_s_per_mp"]
+    return {"path": path, "pages": pages, "has_text": has_text, "cost": cost}
+
+def schedule(paths: List[str]) -> List[str]:
+    # shortest job first, but every interleave_every cheap files one heavy
+    # file goes in, so big scans still make progress and a worker pool has
+    # long jobs to overlap with the short ones
+    cfg = ocr_config["scheduling"]
+    scans = []
+    for path in paths:
+        try:
+            scans.append(prescan(path))
+        except Exception as e:
+            print(f"Prescan failed for {os.path.basename(path)}: {e}")
+            scans.append({"path": path, "pages": 0, "has_text": False, "cost": float("inf")})
+    scans.sort(key=lambda s: s["cost"])
+    finite = [s["cost"] for s in scans if s["cost"] != float("inf")]
+    median = statistics.median(finite) if finite else 0.0
+    light = [s for s in scans if s["cost"] <= median * cfg["heavy_factor"]]
+    heavy = [s for s in scans if s["cost"] > median * cfg["heavy_factor"]]
+
+    heavy_count = len(heavy)
+    order = []
+    while light or heavy:
+        order.extend(light[:cfg["interleave_every"]])
+        del light[:cfg["interleave_every"]]
+        if heavy:
+            order.append(heavy.pop(0))
+    total = sum(finite)
+    print(f"Prescan: {len(scans)} files, {sum(s['has_text'] for s in scans)} with a text layer, "
+          f"{heavy_count} heavy, "
+          f"estimated {total / 60:.1f} min")
+    return [s["path"] for s in order]
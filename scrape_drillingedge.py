@@ -6,12 +6,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.firefox import GeckoDriverManager
 
-db_config = {
-    "host": "localhost",
-    "user": "root",
-    "password": "admin123",
-    "database": "oil_wells"
-}
+from db_settings import db_config
 
 search_url = "https://www.drillingedge.com/search"
 
@@ -0,0 +1,542 @@
+# sinks.py
+# Where ingestion writes its results: MySQL (the map's database), SQLite
+# (offline runs), append-only JSONL (bulk-load later) or nowhere (benchmarks).
+import argparse
+import datetime
+import json
+import math
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from models import WellRecord, stimulation_rows
+
+well_columns = (
+    "filename", "file_hash", "api", "well_name", "address",
+    "latitude", "longitude", "county", "state", "operator",
+    "qc_status", "raw_text",
+)
+stim_columns = (
+    "date_stimulated", "stimulated_formation", "top_ft", "bottom_ft", "stages",
+    "volume", "volume_units", "treatment_type", "lbs_proppant", "acid_percent",
+    "treatment_pressure", "max_treatment_rate", "additional_info",
+)
+survey_columns = (
+    "md", "inclination", "azimuth", "tvd", "northing", "easting", "dogleg", "latitude", "longitude",
+)
+
+def stim_key(values: Dict) -> Tuple:
+    # natural key of a stimulation row within its well (see
+    # alter_stimulations_natural_key.sql); formation compares the way the
+    # MySQL index collation does, case and trailing spaces ignored
+    date = values["date_stimulated"]
+    if isinstance(date, (datetime.date, datetime.datetime)):
+        date = date.isoformat()[:10]
+    formation = values["stimulated_formation"]
+    if isinstance(formation, str):
+        formation = formation.strip().lower()
+    top, bottom = values["top_ft"], values["bottom_ft"]
+    return (date, formation, None if top is None else int(top), None if bottom is None else int(bottom))
+
+def collapse_stim_duplicates(rows) -> Tuple[List, int]:
+    # rows sharing a stim_key are one stimulation read twice (a table split
+    # over pages, or the text and the table parse); the first row is kept
+    # with its missing fields filled from the others. Returns (rows, number
+    # of rows folded into an earlier one)
+    kept = {}
+    for r in rows:
+        key = stim_key({c: getattr(r, c) for c in stim_columns})
+        if key not in kept:
+            kept[key] = r
+            continue
+        first = kept[key]
+        fill = {c: getattr(r, c) for c in stim_columns if getattr(first, c) is None and getattr(r, c) is not None}
+        if fill:
+            kept[key] = first.model_copy(update=fill)
+    return list(kept.values()), len(rows) - len(kept)
+
+def _same(a, b) -> bool:
+    # stored values come back as dates, Decimals or single-precision floats
+    if a is None or b is None:
+        return a is b
+    if isinstance(a, (datetime.date, datetime.datetime)) or isinstance(b, (datetime.date, datetime.datetime)):
+        return str(a)[:10] == str(b)[:10]
+    if isinstance(a, (int, float)) or isinstance(b, (int, float)):
+        try:
+            return math.isclose(float(a), float(b), rel_tol=1e-6, abs_tol=1e-9)
+        except (TypeError, ValueError):
+            return False
+    return a == b
+
+def survey_rows(traj) -> List[Tuple]:
+    n = len(traj["md"])
+    lats = traj["latitude"] if traj["latitude"] is not None else [None] * n
+    lons = traj["longitude"] if traj["longitude"] is not None else [None] * n
+    return [
+        (float(md), float(inc), float(azi), float(tvd), float(nn), float(ee), float(dls),
+         None if lat is None else float(lat), None if lon is None else float(lon))
+        for md, inc, azi, tvd, nn, ee, dls, lat, lon in zip(
+            traj["md"], traj["inclination"], traj["azimuth"], traj["tvd"],
+            traj["northing"], traj["easting"], traj["dogleg"], lats, lons
+        )
+    ]
+
+class NullSink:
+    # accepts everything and stores nothing; measures pure extraction speed
+    name = "null"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_id = 0
+
+    def already_processed(self, file_hash: str) -> bool:
+        return False
+
+    def save_well(self, record: WellRecord) -> Optional[int]:
+        with self.lock:
+            self.last_id += 1
+            return self.last_id
+
+    def update_well(self, well_id: int, fields: Dict, keep_existing=()) -> bool:
+        return True
+
+    def save_stimulations(self, well_id: int, rows, replace: bool = False) -> Tuple[int, int, int]:
+        # returns (inserted, updated, deleted)
+        return len(rows), 0, 0
+
+    def save_surveys(self, well_id: int, traj):
+        pass
+
+    def set_ingest_phase(self, well_id: int, phase: str):
+        pass
+
+    def partial_wells(self) -> List[Tuple]:
+        return []
+
+    def needs_review_wells(self, limit: Optional[int] = None) -> List[Tuple]:
+        return []
+
+    def reparse_chunks(self, batch_size: int) -> Iterator[List[Tuple]]:
+        return iter(())
+
+    def apply_reparse(self, records: List[Tuple[int, WellRecord]], stims: List[Tuple[int, object]]) -> Tuple[int, int, int]:
+        # returns the stimulation (inserted, updated, deleted) totals
+        return 0, 0, 0
+
+    def clone(self) -> "NullSink":
+        # a sink for another thread; only database connections need one each
+        return self
+
+    def close(self):
+        pass
+
+class JsonlSink(NullSink):
+    # one JSON object per line; ids are local to the file and mapped to real
+    # ids when the file is loaded into a database with load_jsonl()
+    name = "jsonl"
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.hashes = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry["type"] == "well":
+                        self.hashes.add(entry["record"].get("file_hash"))
+                        self.last_id = max(self.last_id, entry["id"])
+        self.file = open(path, "a")
+
+    def _write(self, entry: Dict):
+        with self.lock:
+            self.file.write(json.dumps(entry, default=str) + "\n")
+            self.file.flush()
+
+    def already_processed(self, file_hash: str) -> bool:
+        return file_hash in self.hashes
+
+    def save_well(self, record: WellRecord) -> Optional[int]:
+        with self.lock:
+            self.last_id += 1
+            well_id = self.last_id
+            self.hashes.add(record.file_hash)
+        self._write({"type": "well", "id": well_id, "record": record.model_dump(mode="json")})
+        return well_id
+
+    def update_well(self, well_id: int, fields: Dict, keep_existing=()) -> bool:
+        self._write({"type": "well_update", "id": well_id, "fields": fields, "keep_existing": list(keep_existing)})
+        return True
+
+    def save_stimulations(self, well_id: int, rows, replace: bool = False) -> Tuple[int, int, int]:
+        # the diff against stored rows happens when the file is loaded
+        if rows or replace:
+            self._write({"type": "stimulations", "id": well_id, "replace": replace,
+                         "rows": [r.model_dump(mode="json") for r in rows]})
+        return len(rows), 0, 0
+
+    def save_surveys(self, well_id: int, traj):
+        self._write({"type": "surveys", "id": well_id, "rows": survey_rows(traj)})
+
+    def set_ingest_phase(self, well_id: int, phase: str):
+        self.update_well(well_id, {"ingest_phase": phase})
+
+    def close(self):
+        self.file.close()
+
+class SqlSink(NullSink):
+    # shared SQL for the DB-API sinks; queries are written with %s and
+    # rewritten for drivers that use ? placeholders
+    placeholder = "%s"
+    upsert_sql = ""
+
+    def __init__(self):
+        super().__init__()
+        self.conn = None
+
+    def _sql(self, query: str) -> str:
+        return query if self.placeholder == "%s" else query.replace("%s", self.placeholder)
+
+    def _run(self, what: str, statements) -> bool:
+        # statements: (query, params, many) run in one transaction
+        cur = self.conn.cursor()
+        try:
+            for query, params, many in statements:
+                (cur.executemany if many else cur.execute)(self._sql(query), params)
+            self.conn.commit()
+            return True
+        except Exception as e:
+            print(f"DB error while {what}: {e}")
+            self.conn.rollback()
+            return False
+
+    def _query(self, query: str, params=(), keep_open: bool = False) -> List[Tuple]:
+        # a read ends its transaction, or a long-lived MySQL connection keeps
+        # the REPEATABLE READ snapshot of its first read and never sees rows
+        # other connections commit later. keep_open leaves a locking read's
+        # transaction to the writes that follow it
+        cur = self.conn.cursor()
+        try:
+            cur.execute(self._sql(query), params)
+            rows = list(cur.fetchall())
+        except Exception:
+            if not keep_open:
+                self.conn.rollback()
+            raise
+        if not keep_open:
+            self.conn.commit()
+        return rows
+
+    def already_processed(self, file_hash: str) -> bool:
+        return bool(self._query("SELECT id FROM wells WHERE file_hash = %s", (file_hash,)))
+
+    def save_well(self, record: WellRecord) -> Optional[int]:
+        values = tuple(getattr(record, c) for c in well_columns)
+        if not self._run("saving well", [(self.upsert_sql, values, False)]):
+            return None
+        rows = self._query("SELECT id FROM wells WHERE api = %s", (record.api,))
+        return rows[0][0] if rows else None
+
+    def update_well(self, well_id: int, fields: Dict, keep_existing=()) -> bool:
+        if not fields:
+            return True
+        sets = ", ".join(
+            f"{k} = COALESCE({k}, %s)" if k in keep_existing else f"{k} = %s" for k in fields
+        )
+        return self._run("updating well", [(f"UPDATE wells SET {sets} WHERE id = %s", (*fields.values(), well_id), False)])
+
+    # appended to the SELECT of a well's rows before a diff so a concurrent
+    # writer waits for this transaction
+    lock_rows = ""
+
+    def _stim_statements(self, well_id: int, rows, replace: bool):
+        # diffs rows against the well's stored rows by stim_key and returns
+        # (statements, (inserted, updated, deleted)); with replace, stored
+        # rows missing from rows are deleted
+        existing = {}
+        deletes = []
+        for row in self._query(
+            f"SELECT id, {', '.join(stim_columns)} FROM stimulations WHERE well_id = %s ORDER BY id" + self.lock_rows,
+            (well_id,), keep_open=True
+        ):
+            values = dict(zip(stim_columns, row[1:]))
+            key = stim_key(values)
+            if key in existing:
+                # repeated by ingestion before the key existed
+                deletes.append((row[0],))
+            else:
+                existing[key] = (row[0], values)
+        inserts, updates, seen = [], [], set()
+        rows, _ = collapse_stim_duplicates(rows)
+        for r in rows:
+            values = {c: getattr(r, c) for c in stim_columns}
+            key = stim_key(values)
+            seen.add(key)
+            if key not in existing:
+                inserts.append((well_id, *values.values()))
+            elif not all(_same(existing[key][1][c], values[c]) for c in stim_columns):
+                updates.append((*values.values(), existing[key][0]))
+        if replace:
+            deletes.extend((sid,) for key, (sid, _) in existing.items() if key not in seen)
+
+        statements = []
+        if deletes:
+            statements.append(("DELETE FROM stimulations WHERE id = %s", deletes, True))
+        if updates:
+            statements.append((
+                f"UPDATE stimulations SET {', '.join(c + ' = %s' for c in stim_columns)} WHERE id = %s",
+                updates, True,
+            ))
+        if inserts:
+            statements.append((
+                f"INSERT INTO stimulations (well_id, {', '.join(stim_columns)}) "
+                f"VALUES ({', '.join(['%s'] * (len(stim_columns) + 1))})",
+                inserts, True,
+            ))
+        return statements, (len(inserts), len(updates), len(deletes))
+
+    def save_stimulations(self, well_id: int, rows, replace: bool = False) -> Tuple[int, int, int]:
+        try:
+            statements, counts = self._stim_statements(well_id, rows, replace)
+        except Exception as e:
+            print(f"DB error while reading stimulations: {e}")
+            self.conn.rollback()
+            return 0, 0, 0
+        if not statements:
+            # nothing changed; end the read (and its row locks)
+            self.conn.commit()
+        elif not self._run("saving stimulations", statements):
+            return 0, 0, 0
+        return counts
+
+    def save_surveys(self, well_id: int, traj):
+        # a survey has no key of its own; an unchanged one is left alone
+        rows = survey_rows(traj)
+        try:
+            stored = self._query(
+                f"SELECT {', '.join(survey_columns)} FROM surveys WHERE well_id = %s ORDER BY md, id" + self.lock_rows,
+                (well_id,), keep_open=True
+            )
+        except Exception as e:
+            print(f"DB error while reading surveys: {e}")
+            self.conn.rollback()
+            return
+        if len(stored) == len(rows) and all(
+            all(_same(a, b) for a, b in zip(old, new)) for old, new in zip(stored, sorted(rows, key=lambda r: r[0]))
+        ):
+            self.conn.commit()
+            return
+        self._run("saving surveys", [
+            ("DELETE FROM surveys WHERE well_id = %s", (well_id,), False),
+            (f"INSERT INTO surveys (well_id, {', '.join(survey_columns)}) "
+             f"VALUES ({', '.join(['%s'] * (len(survey_columns) + 1))})",
+             [(well_id, *row) for row in rows], True),
+        ])
+
+    def set_ingest_phase(self, well_id: int, phase: str):
+        self.update_well(well_id, {"ingest_phase": phase})
+
+    def partial_wells(self) -> List[Tuple]:
+        return self._query("SELECT id, filename, file_hash FROM wells WHERE ingest_phase = 'partial'")
+
+    def needs_review_wells(self, limit: Optional[int] = None) -> List[Tuple]:
+        return self._query("""
+            SELECT id, filename, file_hash, well_name, latitude, longitude, raw_text
+            FROM wells WHERE qc_status = 'needs_review'
+        """ + (" LIMIT %d" % int(limit) if limit else ""))
+
+    reparse_sql = "SELECT id, filename, file_hash, raw_text FROM wells"
+
+    def reparse_chunks(self, batch_size: int) -> Iterator[List[Tuple]]:
+        cur = self.conn.cursor()
+        cur.execute(self.reparse_sql)
+        while True:
+            chunk = cur.fetchmany(batch_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def apply_reparse(self, records, stims):
+        statements = [(
+            """
+            UPDATE wells SET
+                api = %s, well_name = %s, address = %s,
+                latitude = %s, longitude = %s, county = %s,
+                state = %s, operator = %s, qc_status = %s
+            WHERE id = %s
+            """,
+            [(r.api, r.well_name, r.address, r.latitude, r.longitude,
+              r.county, r.state, r.operator, r.qc_status, wid) for wid, r in records if r.api],
+            True,
+        )]
+        by_well = {}
+        for wid, stim in stims:
+            by_well.setdefault(wid, []).append(stim)
+        totals = [0, 0, 0]
+        try:
+            for wid, rows in by_well.items():
+                well_statements, counts = self._stim_statements(wid, rows, False)
+                statements.extend(well_statements)
+                totals = [t + c for t, c in zip(totals, counts)]
+        except Exception as e:
+            print(f"DB error while reading stimulations: {e}")
+            self.conn.rollback()
+            return 0, 0, 0
+        if not self._run("reparsing", statements):
+            return 0, 0, 0
+        return tuple(totals)
+
+    def close(self):
+        self.conn.close()
+
+class MySQLSink(SqlSink):
+    name = "mysql"
+    lock_rows = " FOR UPDATE"
+    upsert_sql = f"""
+        INSERT INTO wells ({', '.join(well_columns)})
+        VALUES ({', '.join(['%s'] * len(well_columns))})
+        ON DUPLICATE KEY UPDATE
+            raw_text = VALUES(raw_text),
+            latitude = VALUES(latitude),
+            longitude = VALUES(longitude),
+            qc_status = VALUES(qc_status)
+    """
+
+    def __init__(self, db_config: Dict):
+        import pymysql
+        super().__init__()
+        self.db_config = db_config
+        self.conn = pymysql.connect(**db_config)
+
+    def clone(self) -> "MySQLSink":
+        return MySQLSink(self.db_config)
+
+    def reparse_chunks(self, batch_size: int) -> Iterator[List[Tuple]]:
+        # unbuffered cursor on a second connection so the whole table is never
+        # held in memory while updates go through the main one
+        import pymysql
+        import pymysql.cursors
+        read_conn = pymysql.connect(**self.db_config, cursorclass=pymysql.cursors.SSCursor)
+        try:
+            with read_conn.cursor() as rc:
+                rc.execute(self.reparse_sql)
+                while True:
+                    chunk = rc.fetchmany(batch_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            read_conn.close()
+
+sqlite_schema = """
+CREATE TABLE IF NOT EXISTS wells (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  filename TEXT, file_hash TEXT UNIQUE, api TEXT UNIQUE, well_name TEXT,
+  address TEXT, latitude REAL, longitude REAL, county TEXT, state TEXT,
+  operator TEXT, qc_status TEXT DEFAULT 'pending', raw_text TEXT,
+  ingest_phase TEXT NOT NULL DEFAULT 'complete',
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS stimulations (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  well_id INTEGER REFERENCES wells(id) ON DELETE CASCADE,
+  date_stimulated DATE, stimulated_formation TEXT, top_ft INTEGER, bottom_ft INTEGER,
+  stages INTEGER, volume REAL, volume_units TEXT, treatment_type TEXT,
+  lbs_proppant INTEGER, acid_percent REAL, treatment_pressure REAL,
+  max_treatment_rate REAL, additional_info TEXT
+);
+CREATE TABLE IF NOT EXISTS surveys (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  well_id INTEGER REFERENCES wells(id) ON DELETE CASCADE,
+  md REAL, inclination REAL, azimuth REAL, tvd REAL, northing REAL,
+  easting REAL, dogleg REAL, latitude REAL, longitude REAL
+);
+CREATE INDEX IF NOT EXISTS surveys_well_id ON surveys (well_id);
+"""
+
+sqlite_stim_key = """
+DELETE FROM stimulations WHERE id NOT IN (
+  SELECT MIN(id) FROM stimulations
+  GROUP BY well_id, date_stimulated, TRIM(stimulated_formation) COLLATE NOCASE, top_ft, bottom_ft
+);
+CREATE UNIQUE INDEX stimulation_key ON stimulations
+  (well_id, date_stimulated, stimulated_formation COLLATE NOCASE, top_ft, bottom_ft);
+"""
+
+class SQLiteSink(SqlSink):
+    name = "sqlite"
+    placeholder = "?"
+    upsert_sql = f"""
+        INSERT INTO wells ({', '.join(well_columns)})
+        VALUES ({', '.join(['%s'] * len(well_columns))})
+        ON CONFLICT(api) DO UPDATE SET
+            raw_text = excluded.raw_text,
+            latitude = excluded.latitude,
+            longitude = excluded.longitude,
+            qc_status = excluded.qc_status
+    """
+
+    def __init__(self, path: str):
+        import sqlite3
+        super().__init__()
+        self.path = path
+        # the pipeline's store stage writes from its own thread
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(sqlite_schema)
+        if not self._query("SELECT 1 FROM sqlite_master WHERE name = 'stimulation_key'"):
+            # files written before the natural key may hold repeated rows
+            self.conn.executescript(sqlite_stim_key)
+
+    def clone(self) -> "SQLiteSink":
+        return SQLiteSink(self.path)
+
+def open_sink(kind: str, path: str = "", db_config: Optional[Dict] = None) -> NullSink:
+    if kind == "mysql":
+        return MySQLSink(db_config)
+    if kind == "sqlite":
+        return SQLiteSink(path or "oil_wells.sqlite")
+    if kind == "jsonl":
+        return JsonlSink(path or "wells.jsonl")
+    if kind == "null":
+        return NullSink()
+    raise ValueError(f"Unknown sink: {kind}")
+
+def load_jsonl(path: str, target: NullSink) -> int:
+    # replays a JSONL sink file into another sink, mapping file-local well ids
+    ids = {}
+    with open(path) as f:
+        for line in f:
+            entry = json.loads(line)
+            kind = entry["type"]
+            if kind == "well":
+                ids[entry["id"]] = target.save_well(WellRecord.model_validate(entry["record"]))
+                continue
+            well_id = ids.get(entry["id"])
+            if well_id is None:
+                continue
+            if kind == "well_update":
+                target.update_well(well_id, entry["fields"], entry.get("keep_existing", ()))
+            elif kind == "stimulations":
+                target.save_stimulations(well_id, stimulation_rows.validate_python(entry["rows"]), entry["replace"])
+            elif kind == "surveys":
+                rows = entry["rows"]
+                traj = {c: [r[i] for r in rows] for i, c in enumerate(survey_columns)}
+                target.save_surveys(well_id, traj)
+    return len(ids)
+
+def main():
+    from db_settings import db_config
+    parser = argparse.ArgumentParser(description="Load a JSONL sink file into a database")
+    parser.add_argument("path")
+    parser.add_argument("--sink", choices=["mysql", "sqlite"], default="mysql")
+    parser.add_argument("--sink-path", default="")
+    args = parser.parse_args()
+    target = open_sink(args.sink, args.sink_path, db_config)
+    try:
+        print(f"Loaded {load_jsonl(args.path, target)} wells into {target.name}")
+    finally:
+        target.close()
+
+if __name__ == "__main__":
+    main()
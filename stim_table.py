@@ -0,0 +1,211 @@
+# stim_table.py
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+stim_page_re = re.compile(r'Well Specific Stimulation|Date\s+Stimulated', flags=re.IGNORECASE)
+
+# keyword -> field, checked in order so "Volume Units" is not taken as "Volume"
+main_fields = [
+    ("units", "volume_units"),
+    ("date", "date_stimulated"),
+    ("formation", "stimulated_formation"),
+    ("top", "top_ft"),
+    ("bottom", "bottom_ft"),
+    ("stage", "stages"),
+    ("volume", "volume"),
+]
+ext_fields = [
+    ("pressure", "treatment_pressure"),
+    ("rate", "max_treatment_rate"),
+    ("proppant", "lbs_proppant"),
+    ("acid", "acid_percent"),
+    ("type", "treatment_type"),
+]
+
+row_keys = [
+    "date_stimulated", "stimulated_formation", "top_ft", "bottom_ft", "stages",
+    "volume", "volume_units", "treatment_type", "lbs_proppant", "acid_percent",
+    "treatment_pressure", "max_treatment_rate", "additional_info",
+]
+
+date_re = re.compile(r'\d{1,2}/\d{1,2}/\d{4}')
+
+def is_stim_page(text: str) -> bool:
+    return bool(text) and stim_page_re.search(text) is not None
+
+def _to_date(s: str):
+    m = date_re.search(s or '')
+    if not m:
+        return None
+    try:
+        return datetime.strptime(m.group(0), "%m/%d/%Y").date()
+    except Exception:
+        return None
+
+def _to_int(s: str) -> Optional[int]:
+    m = re.search(r'\d[\d,]*', s or '')
+    if not m:
+        return None
+    return int(m.group(0).replace(',', ''))
+
+def _to_float(s: str) -> Optional[float]:
+    m = re.search(r'\d[\d,]*(?:\.\d+)?|\.\d+', s or '')
+    if not m:
+        return None
+    return float(m.group(0).replace(',', ''))
+
+def _to_text(s: str) -> Optional[str]:
+    s = (s or '').strip()
+    return s or None
+
+converters = {
+    "date_stimulated": _to_date,
+    "stimulated_formation": _to_text,
+    "top_ft": _to_int,
+    "bottom_ft": _to_int,
+    "stages": _to_int,
+    "volume": _to_float,
+    "volume_units": _to_text,
+    "treatment_type": _to_text,
+    "lbs_proppant": _to_int,
+    "acid_percent": _to_float,
+    "treatment_pressure": _to_float,
+    "max_treatment_rate": _to_float,
+}
+
+def _word_arrays(data: Dict):
+    text = np.array([str(t).strip() for t in data.get("text", [])], dtype=object)
+    if not len(text):
+        return None
+    conf = np.array([float(c) for c in data["conf"]])
+    keep = (text != "") & (conf >= 0)
+    if not keep.any():
+        return None
+    left = np.asarray(data["left"], dtype=float)[keep]
+    top = np.asarray(data["top"], dtype=float)[keep]
+    width = np.asarray(data["width"], dtype=float)[keep]
+    height = np.asarray(data["height"], dtype=float)[keep]
+    return text[keep], left, left + width, top + height / 2.0, height
+
+def _group_lines(yc: np.ndarray, height: np.ndarray) -> np.ndarray:
+    order = np.argsort(yc, kind="stable")
+    breaks = np.diff(yc[order]) > 0.5 * np.median(height)
+    line_sorted = np.concatenate(([0], np.cumsum(breaks)))
+    line_id = np.empty_like(line_sorted)
+    line_id[order] = line_sorted
+    return line_id
+
+def _spans(left: np.ndarray, right: np.ndarray, gap: float):
+    order = np.argsort(left, kind="stable")
+    l, r = left[order], right[order]
+    reach = np.maximum.accumulate(r)
+    starts = np.flatnonzero(np.concatenate(([True], l[1:] > reach[:-1] + gap)))
+    return l[starts], np.maximum.reduceat(r, starts)
+
+def _label_columns(col_l, col_r, head_text, head_l, head_r, gap, fields):
+    labels = [None] * len(col_l)
+    if not len(head_l):
+        return labels
+    hl, hr = _spans(head_l, head_r, gap)
+    hcol = np.clip(np.searchsorted(hl, (head_l + head_r) / 2.0, side="right") - 1, 0, len(hl) - 1)
+    head_labels = []
+    for i in range(len(hl)):
+        words = ' '.join(head_text[hcol == i]).lower()
+        head_labels.append(next((f for kw, f in fields if kw in words), None))
+    head_labels = np.array(head_labels, dtype=object)
+
+    # each header cluster belongs to the data column whose cell (split halfway
+    # between neighbouring columns) contains its centre
+    bounds = (col_r[:-1] + col_l[1:]) / 2.0
+    cell = np.searchsorted(bounds, (hl + hr) / 2.0)
+    overlap = np.minimum(col_r[:, None], hr[None, :]) - np.maximum(col_l[:, None], hl[None, :])
+    centre_dist = np.abs((col_l + col_r)[:, None] - (hl + hr)[None, :]) / 2.0
+    score = np.where(overlap > 0, overlap, -centre_dist)
+    usable = (cell[None, :] == np.arange(len(col_l))[:, None]) & (head_labels != None)[None, :]  # noqa: E711
+    score = np.where(usable, score, -np.inf)
+    for i in np.flatnonzero(usable.any(axis=1)):
+        labels[i] = head_labels[score[i].argmax()]
+    return labels
+
+def _segment_rows(seg, text, left, right, line_id, fields, gap):
+    head_mask = np.isin(line_id, seg["header"])
+    data_lines = seg["data"]
+    if not data_lines:
+        return []
+    data_mask = np.isin(line_id, data_lines)
+    col_l, col_r = _spans(left[data_mask], right[data_mask], gap)
+    labels = _label_columns(col_l, col_r, text[head_mask], left[head_mask], right[head_mask], gap, fields)
+
+    d_text, d_l, d_r, d_line = text[data_mask], left[data_mask], right[data_mask], line_id[data_mask]
+    d_col = np.clip(np.searchsorted(col_l, (d_l + d_r) / 2.0, side="right") - 1, 0, len(col_l) - 1)
+    order = np.lexsort((d_l, d_line))
+
+    rows = []
+    for ln in data_lines:
+        cells = {}
+        for i in order[d_line[order] == ln]:
+            field = labels[d_col[i]]
+            if field:
+                cells[field] = (cells.get(field, '') + ' ' + d_text[i]).strip()
+        row = {f: converters[f](v) for f, v in cells.items()}
+        if any(v is not None for v in row.values()):
+            rows.append(row)
+    return rows
+
+def extract_stim_table(data: Dict) -> List[Dict]:
+    words = _word_arrays(data)
+    if words is None:
+        return []
+    text, left, right, yc, height = words
+    line_id = _group_lines(yc, height)
+    gap = 1.2 * float(np.median(height))
+
+    n_lines = int(line_id.max()) + 1
+    line_text = [' '.join(text[line_id == i][np.argsort(left[line_id == i])]).lower() for i in range(n_lines)]
+    line_y = np.array([yc[line_id == i].mean() for i in range(n_lines)])
+    line_order = np.argsort(line_y)
+
+    segments = []
+    seg = None
+    for ln in line_order:
+        t = line_text[ln]
+        if 'date' in t and 'stimulated' in t:
+            seg = {"kind": "main", "header": [ln], "data": []}
+            segments.append(seg)
+        elif ('type' in t and 'treatment' in t) or 'proppant' in t:
+            seg = {"kind": "ext", "header": [ln], "data": []}
+            segments.append(seg)
+        elif seg is None:
+            continue
+        elif t.startswith('details') or 'additional' in t or 'signature' in t:
+            seg = None
+        elif not re.search(r'\d', t):
+            # wrapped header labels such as "Stimulation\nStages" or "(BBLS/Min)"
+            if not seg["data"]:
+                seg["header"].append(ln)
+            else:
+                seg = None
+        elif seg["kind"] == "main" and not date_re.search(t):
+            if not seg["data"]:
+                seg["header"].append(ln)
+        else:
+            seg["data"].append(ln)
+
+    rows = []
+    pending = 0
+    for seg in segments:
+        if seg["kind"] == "main":
+            for r in _segment_rows(seg, text, left, right, line_id, main_fields, gap):
+                rows.append(dict.fromkeys(row_keys) | r)
+        else:
+            for r in _segment_rows(seg, text, left, right, line_id, ext_fields, gap):
+                if pending < len(rows):
+                    rows[pending].update(r)
+                    pending += 1
+                else:
+                    rows.append(dict.fromkeys(row_keys) | r)
+                    pending = len(rows)
+    return rows
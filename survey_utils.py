@@ -0,0 +1,136 @@
+# survey_utils.py
+import re
+from typing import Dict, Optional
+
+import numpy as np
+
+survey_header_re = re.compile(
+    r'(?:\bMD\b|Measured\s+Depth|Meas\.?\s+Depth).*?(?:\bInc|\bIncl).*?(?:\bAz|\bAzi|\bAzm|Azimuth)',
+    flags=re.IGNORECASE
+)
+number_re = re.compile(r'-?\d[\d,]*\.?\d*')
+
+feet_per_degree_lat = 364000.0
+max_gap_lines = 6
+# horizontal wells build past 90; anything much beyond is not an inclination
+max_inclination = 120.0
+
+def _survey_blocks(text: str):
+    # numeric lines under each survey header; a block ends at the next header
+    # or after max_gap_lines lines without a row of numbers
+    blocks = []
+    block = None
+    misses = 0
+    for ln in text.splitlines():
+        if survey_header_re.search(ln):
+            block = []
+            blocks.append(block)
+            misses = 0
+            continue
+        if block is None:
+            continue
+        nums = number_re.findall(ln)
+        if len(nums) >= 3:
+            block.append(nums[:4])
+            misses = 0
+        else:
+            misses += 1
+            if misses > max_gap_lines:
+                block = None
+    return blocks
+
+def _to_float(n: str) -> float:
+    try:
+        return float(n.replace(',', ''))
+    except ValueError:
+        return np.nan
+
+def _valid(vals) -> bool:
+    md, inc, azi = vals
+    return 0 <= md <= 40000 and 0 <= inc <= max_inclination and 0 <= azi <= 360
+
+def _block_stations(rows) -> np.ndarray:
+    # stations from the top of one block, ending at the first row that is not
+    # a valid station or does not go deeper. Some reports lead with a station
+    # number: the block reads at the column offset most rows fit, and a row
+    # that only fits the other one (an unnumbered tie-in) is read at that.
+    parsed = [[[_to_float(n) for n in nums[o:o + 3]] for o in (0, 1)] for nums in rows]
+    fits = [sum(len(p[o]) == 3 and _valid(p[o]) for p in parsed) for o in (0, 1)]
+    order = (1, 0) if fits[1] > fits[0] else (0, 1)
+    out = []
+    for p in parsed:
+        for o in order:
+            vals = p[o]
+            if len(vals) == 3 and _valid(vals) and (not out or vals[0] > out[-1][0]):
+                out.append(vals)
+                break
+        else:
+            break
+    return np.array(out).reshape(-1, 3)
+
+def extract_surveys(text: str) -> Optional[np.ndarray]:
+    # one survey is used, not a merge of every table: reports carry the
+    # planned and the actual survey, and interleaving them gives nonsense
+    # doglegs. A table continued under a repeated header on the next page
+    # (its next block starts deeper) is joined; the longest survey (deepest
+    # on a tie) is taken as the definitive one.
+    if not text:
+        return None
+    surveys = []
+    for rows in _survey_blocks(text):
+        block = _block_stations(rows)
+        if not len(block):
+            continue
+        if surveys and block[0, 0] > surveys[-1][-1, 0]:
+            surveys[-1] = np.vstack([surveys[-1], block])
+        else:
+            surveys.append(block)
+    surveys = [s for s in surveys if len(s) >= 2]
+    if not surveys:
+        return None
+    stations = max(surveys, key=lambda s: (len(s), s[-1, 0]))
+    stations[:, 2] = np.mod(stations[:, 2], 360.0)
+    if stations[0, 0] > 0:
+        stations = np.vstack([[0.0, 0.0, 0.0], stations])
+    return stations
+
+def compute_trajectory(stations: np.ndarray, surface_lat: Optional[float] = None,
+                       surface_lon: Optional[float] = None) -> Dict[str, np.ndarray]:
+    md = stations[:, 0]
+    inc = np.radians(stations[:, 1])
+    azi = np.radians(stations[:, 2])
+
+    i1, i2 = inc[:-1], inc[1:]
+    a1, a2 = azi[:-1], azi[1:]
+    dmd = np.diff(md)
+
+    cos_dl = np.cos(i2 - i1) - np.sin(i1) * np.sin(i2) * (1.0 - np.cos(a2 - a1))
+    dl = np.arccos(np.clip(cos_dl, -1.0, 1.0))
+    small = dl < 1e-9
+    rf = np.where(small, 1.0, 2.0 / np.where(small, 1.0, dl) * np.tan(dl / 2.0))
+
+    half = dmd / 2.0 * rf
+    d_north = half * (np.sin(i1) * np.cos(a1) + np.sin(i2) * np.cos(a2))
+    d_east = half * (np.sin(i1) * np.sin(a1) + np.sin(i2) * np.sin(a2))
+    d_tvd = half * (np.cos(i1) + np.cos(i2))
+
+    north = np.concatenate(([0.0], np.cumsum(d_north)))
+    east = np.concatenate(([0.0], np.cumsum(d_east)))
+    tvd = np.concatenate(([0.0], np.cumsum(d_tvd)))
+    dls = np.concatenate(([0.0], np.degrees(dl) / np.where(dmd > 0, dmd, np.inf) * 100.0))
+
+    out = {
+        "md": md,
+        "inclination": stations[:, 1],
+        "azimuth": stations[:, 2],
+        "tvd": tvd,
+        "northing": north,
+        "easting": east,
+        "dogleg": dls,
+        "latitude": None,
+        "longitude": None,
+    }
+    if surface_lat is not None and surface_lon is not None:
+        out["latitude"] = surface_lat + north / feet_per_degree_lat
+        out["longitude"] = surface_lon + east / (feet_per_degree_lat * np.cos(np.radians(surface_lat)))
+    return out
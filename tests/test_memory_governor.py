@@ -0,0 +1,27 @@
+# tests/test_memory_governor.py
+from memory_governor import MemoryGovernor, mb
+from ocr_config import ocr_config
+
+def _governor(monkeypatch, headroom):
+    gov = MemoryGovernor()
+    gov.worker_bytes = 100 * mb
+    monkeypatch.setattr(gov, "enabled", lambda: True)
+    monkeypatch.setattr(gov, "headroom", lambda: headroom[0])
+    monkeypatch.setitem(ocr_config, "ocr_workers", 4)
+    return gov
+
+def test_pool_shrinks_when_headroom_is_short_and_grows_back_only_when_all_fit(monkeypatch):
+    headroom = [1000 * mb]
+    gov = _governor(monkeypatch, headroom)
+    assert gov.ocr_workers() == 4
+    headroom[0] = 250 * mb
+    assert gov.ocr_workers() == 2
+    # room for three workers is not enough to grow back
+    headroom[0] = 350 * mb
+    assert gov.ocr_workers() == 2
+    headroom[0] = 400 * mb
+    assert gov.ocr_workers() == 4
+
+def test_pool_keeps_one_worker_without_headroom(monkeypatch):
+    gov = _governor(monkeypatch, [-50 * mb])
+    assert gov.ocr_workers() == 1
@@ -0,0 +1,47 @@
+# tests/test_page_fingerprint.py
+import numpy as np
+from PIL import Image, ImageDraw
+
+from ocr_config import ocr_config
+from page_fingerprint import BoilerplateLibrary, coverage_per_mille, hash_bytes, page_fingerprint, popcount
+
+def _form(filled=False):
+    # a dense form page: ruled boxes and label text, with values written into
+    # the boxes of the filled copy
+    img = Image.new("L", (850, 1100), 255)
+    draw = ImageDraw.Draw(img)
+    for row in range(20):
+        y = 60 + row * 50
+        draw.rectangle((40, y, 810, y + 44), outline=0, width=2)
+        for x in range(50, 380, 40):
+            draw.rectangle((x, y + 8, x + 30, y + 18), fill=0)
+        if filled:
+            for x in range(420, 800, 40):
+                draw.rectangle((x, y + 26, x + 8, y + 32), fill=0)
+    return img
+
+def _library(tmp_path, *pages):
+    lib = BoilerplateLibrary(str(tmp_path / "boilerplate.json"))
+    for n in range(ocr_config["boilerplate"]["min_docs"]):
+        for page in pages:
+            lib.observe(page_fingerprint(page), "operator well name api location", f"doc{n}.pdf")
+    return lib
+
+def test_dense_form_coverage_is_not_saturated():
+    blank, filled = page_fingerprint(_form()), page_fingerprint(_form(filled=True))
+    assert 0 < coverage_per_mille(blank) < coverage_per_mille(filled) < 1000
+
+def test_filled_form_does_not_match_blank(tmp_path):
+    blank, filled = _form(), _form(filled=True)
+    # the hash alone cannot tell them apart
+    a, b = page_fingerprint(blank), page_fingerprint(filled)
+    assert popcount[a[:hash_bytes] ^ b[:hash_bytes]].sum() <= ocr_config["boilerplate"]["max_distance"]
+    lib = _library(tmp_path, blank)
+    assert lib.is_boilerplate(page_fingerprint(blank))
+    assert not lib.is_boilerplate(page_fingerprint(filled))
+
+def test_library_round_trip(tmp_path):
+    lib = _library(tmp_path, _form())
+    lib.save()
+    assert BoilerplateLibrary(lib.path).is_boilerplate(page_fingerprint(_form()))
+    assert np.array_equal(BoilerplateLibrary(lib.path).hashes, lib.hashes)
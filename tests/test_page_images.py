@@ -0,0 +1,41 @@
+# tests/test_page_images.py
+import zlib
+
+import numpy as np
+import pikepdf
+from pikepdf import Array, Name
+
+from page_images import extract_scan_image
+
+def _scan_page(pixels: np.ndarray, bits: int, decode=None):
+    # one-page PDF whose only content is a full-page grayscale image
+    h, w = pixels.shape
+    raw = np.packbits(pixels.astype(bool), axis=1) if bits == 1 else pixels.astype(np.uint8)
+    pdf = pikepdf.new()
+    img = pikepdf.Stream(pdf, zlib.compress(raw.tobytes()))
+    img.Type, img.Subtype = Name.XObject, Name.Image
+    img.Width, img.Height = w, h
+    img.ColorSpace, img.BitsPerComponent, img.Filter = Name.DeviceGray, bits, Name.FlateDecode
+    if decode is not None:
+        img.Decode = Array(decode)
+    page = pdf.add_blank_page(page_size=(w, h))
+    page.Resources = pikepdf.Dictionary(XObject=pikepdf.Dictionary(Im0=img))
+    page.Contents = pikepdf.Stream(pdf, f"q {w} 0 0 {h} 0 0 cm /Im0 Do Q".encode())
+    return pdf
+
+def _gray(pdf):
+    return np.asarray(extract_scan_image(pdf.pages[0]).convert("L"))
+
+def test_inverted_scan_comes_out_black_on_white():
+    # 1-bit scan stored with ink as 1 and /Decode [1 0]
+    ink = np.zeros((64, 64), bool)
+    ink[20:40, 20:40] = True
+    gray = _gray(_scan_page(ink, 1, [1, 0]))
+    assert gray[30, 30] == 0 and gray[5, 5] == 255
+
+def test_dark_page_is_not_inverted():
+    # a legitimately dark page (photo, dark background) stays as it is
+    pixels = np.full((64, 64), 30, np.uint8)
+    pixels[20:40, 20:40] = 220
+    gray = _gray(_scan_page(pixels, 8))
+    assert gray[5, 5] == 30 and gray[30, 30] == 220
@@ -0,0 +1,126 @@
+# tune_ocr.py
+# Calibrates OCR throughput on a sample of the corpus over a grid of
+# (workers, OMP_THREAD_LIMIT, DPI, batch size) and saves the fastest setting
+# whose text still matches the highest-DPI reading closely enough.
+import argparse
+import itertools
+import os
+import re
+import time
+
+from image_prep import preprocess_page
+from ocr_config import ocr_config, save_config
+from ocr_worker import ocr_pages, shutdown_pool
+from page_images import load_page_images, page_count
+
+pdf_folder = "pdfs"
+
+def _ints(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+def _words(text):
+    return set(re.findall(r'[a-z0-9]{3,}', text.lower()))
+
+def sample_files(count):
+    files = [os.path.join(pdf_folder, f) for f in sorted(os.listdir(pdf_folder)) if f.lower().endswith(".pdf")]
+    # spread the sample over the corpus rather than taking the first few files
+    step = max(1, len(files) // count) if count else 1
+    return files[::step][:count]
+
+def run_config(files, pages, dpi, batch):
+    # renders, preprocesses and OCRs the sample the way ingestion does;
+    # returns (seconds, pages OCR'd, text per (file, page))
+    texts = {}
+    done = 0
+    start = time.perf_counter()
+    for path in files:
+        try:
+            # a short file contributes the pages it has
+            doc_pages = min(pages, page_count(path))
+        except Exception as e:
+            print(f"  {os.path.basename(path)}: {e}")
+            continue
+        page = 1
+        while page <= doc_pages:
+            last = min(page + batch - 1, doc_pages)
+            try:
+                images = [preprocess_page(img) for img in load_page_images(path, page, last, dpi=dpi)]
+            except Exception as e:
+                print(f"  {os.path.basename(path)} pages {page}-{last}: {e}")
+                break
+            if not images:
+                break
+            for img, (text, _, _, status) in zip(images, ocr_pages(images)):
+                texts[(path, img.info.get("page"))] = text if status != "timeout" else ""
+                done += 1
+            page = last + 1
+    return time.perf_counter() - start, done, texts
+
+def accuracy(texts, reference):
+    # share of the reference words recovered, over all sampled pages
+    found = total = 0
+    for key, ref in reference.items():
+        ref_words = _words(ref)
+        found += len(ref_words & _words(texts.get(key, "")))
+        total += len(ref_words)
+    return found / total if total else 1.0
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Tune OCR workers, threads, DPI and batch size")
+    parser.add_argument("--files", type=int, default=4, help="number of PDFs to sample")
+    parser.add_argument("--pages", type=int, default=6, help="pages per sampled PDF")
+    parser.add_argument("--workers", type=_ints, default=sorted({1, max(1, cpus // 2), cpus}))
+    parser.add_argument("--threads", type=_ints, default=sorted({1, 2, cpus}), help="OMP_THREAD_LIMIT values")
+    parser.add_argument("--dpi", type=_ints, default=[150, 200, 225, 300])
+    parser.add_argument("--batch", type=_ints, default=[6, 12, 24])
+    parser.add_argument("--min-accuracy", type=float, default=0.95,
+                        help="minimum share of the highest-DPI words a setting must recover")
+    parser.add_argument("--save", action="store_true", help="write the winner to ocr_config.json")
+    args = parser.parse_args()
+
+    files = sample_files(args.files)
+    if not files:
+        print(f"No PDFs in {pdf_folder}")
+        return
+    print(f"Sample: {len(files)} files x {args.pages} pages, {cpus} CPUs")
+    # every setting renders for real; cached pages would hide the cost of DPI
+    ocr_config["page_cache"]["enabled"] = False
+
+    grid = [
+        (w, t, d, b)
+        for w, t, d, b in itertools.product(args.workers, args.threads, sorted(args.dpi, reverse=True), args.batch)
+        # more busy threads than twice the cores only measures contention
+        if w * t <= 2 * cpus
+    ]
+    reference = None
+    scores = {}
+    results = []
+    for workers, threads, dpi, batch in grid:
+        shutdown_pool()
+        ocr_config.update(ocr_workers=workers, omp_thread_limit=threads)
+        seconds, done, texts = run_config(files, args.pages, dpi, batch)
+        if reference is None:
+            reference = texts
+        # the text only depends on the DPI, so score each DPI once
+        if dpi not in scores:
+            scores[dpi] = accuracy(texts, reference)
+        rate = done / seconds if seconds else 0.0
+        results.append((rate, workers, threads, dpi, batch))
+        print(f"  workers {workers:2d}  threads {threads:2d}  dpi {dpi:3d}  batch {batch:3d}  "
+              f"{rate:6.2f} pages/s  accuracy {scores[dpi]:.3f}")
+    shutdown_pool()
+
+    usable = [r for r in results if scores[r[3]] >= args.min_accuracy]
+    if not usable:
+        print(f"\nNo setting reached accuracy {args.min_accuracy}")
+        return
+    rate, workers, threads, dpi, batch = max(usable)
+    best = {"ocr_workers": workers, "omp_thread_limit": threads, "ocr_dpi": dpi, "batch_size": batch}
+    print(f"\nBest: {rate:.2f} pages/s with {best}")
+    if args.save:
+        save_config(best)
+        print("Saved as ingestion defaults in ocr_config.json")
+
+if __name__ == "__main__":
+    main()
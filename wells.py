@@ -0,0 +1,131 @@
+# wells.py
+# One command for ingestion, maintenance and the web app. Each subcommand
+# imports its module only when it runs, so --help, queue commands and new
+# workers do not pay for the OCR stack or open a database connection.
+import argparse
+import importlib
+import sys
+
+def _set_sink(args):
+    from ocr_config import ocr_config
+    if args.sink:
+        ocr_config["sink"] = args.sink
+    if args.sink_path:
+        ocr_config["sink_path"] = args.sink_path
+
+def ingest(args, rest):
+    _set_sink(args)
+    import ocr_and_extract
+    ocr_and_extract.main(args.pipeline, args.archives)
+
+def reparse(args, rest):
+    _set_sink(args)
+    import ocr_and_extract
+    ocr_and_extract.reparse_all(args.batch_size)
+
+def repair(args, rest):
+    _set_sink(args)
+    import ocr_and_extract
+    ocr_and_extract.repair_needs_review(args.limit)
+    ocr_and_extract.shutdown_pool()
+    ocr_and_extract.print_run_summary()
+
+def preprocess(args, rest):
+    import preprocess_and_store
+    preprocess_and_store.main()
+
+def scrape(args, rest):
+    import scrape_drillingedge
+    scrape_drillingedge.main()
+
+def seed(args, rest):
+    import load_data
+    load_data.main()
+
+def serve(args, rest):
+    from app import app
+    app.run(host=args.host, port=args.port, debug=args.debug)
+
+def bench(parser, args, rest):
+    if args.which is None:
+        parser.print_help()
+        sys.exit(0 if set(rest) & {"-h", "--help"} else 2)
+    _run_script(benches[args.which], f"bench {args.which}", rest)
+
+# subcommands handed to a script's own argument parser
+scripts = {
+    "tune": ("tune_ocr", "calibrate OCR workers, threads, DPI and batch size"),
+    "queue": ("job_queue", "shared ingest job queue (enqueue, work)"),
+    "load-jsonl": ("sinks", "load a JSONL sink file into MySQL or SQLite"),
+}
+benches = {
+    "preprocess": "bench_preprocess",
+    "text": "bench_text_backends",
+    "transport": "bench_transport",
+}
+
+def _run_script(module, name, rest):
+    sys.argv = [f"wells {name}"] + rest
+    importlib.import_module(module).main()
+
+def _add_sink_flags(p):
+    p.add_argument("--sink", choices=["mysql", "sqlite", "jsonl", "null"], help="overrides sink in ocr_config.json")
+    p.add_argument("--sink-path", help="SQLite or JSONL file")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="wells", description="Oil well PDF ingestion and map")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="OCR and extract every PDF (and ZIP/TAR bundle) in pdfs/")
+    p.add_argument("archives", nargs="*", help="extra ZIP/TAR bundles to read in place")
+    p.add_argument("--pipeline", action="store_true", help="run the staged render/OCR/parse/store pipeline")
+    _add_sink_flags(p)
+    p.set_defaults(func=ingest)
+
+    p = sub.add_parser("reparse", help="re-run the extractors over stored raw_text")
+    p.add_argument("--batch-size", type=int, default=1000)
+    _add_sink_flags(p)
+    p.set_defaults(func=reparse)
+
+    p = sub.add_parser("repair", help="re-OCR the pages likely to hold missing fields of needs_review wells")
+    p.add_argument("--limit", type=int)
+    _add_sink_flags(p)
+    p.set_defaults(func=repair)
+
+    p = sub.add_parser("preprocess", help="clean addresses, names and coordinates already in the database")
+    p.set_defaults(func=preprocess)
+    p = sub.add_parser("scrape", help="look up stored APIs on drillingedge.com")
+    p.set_defaults(func=scrape)
+    p = sub.add_parser("seed", help="insert a sample well into an empty database")
+    p.set_defaults(func=seed)
+
+    p = sub.add_parser("serve", help="run the map web app")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=5000)
+    p.add_argument("--debug", action="store_true")
+    p.set_defaults(func=serve)
+
+    # no help flag of its own so "wells bench text --help" reaches the
+    # benchmark; "wells bench" alone (or with --help) lists the benchmarks
+    p = sub.add_parser("bench", help="benchmarks: " + ", ".join(benches), add_help=False,
+                       description="Run a benchmark; options after its name go to the benchmark.")
+    p.add_argument("which", nargs="?", choices=sorted(benches))
+    p.set_defaults(func=lambda args, rest, p=p: bench(p, args, rest))
+
+    for name, (module, help_text) in scripts.items():
+        p = sub.add_parser(name, help=help_text, add_help=False)
+        p.set_defaults(func=lambda args, rest, module=module, name=name: _run_script(module, name, rest))
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = build_parser()
+    # everything a passthrough subcommand does not know goes to its script
+    args, rest = parser.parse_known_args(argv)
+    passthrough = args.command in scripts or args.command == "bench"
+    if rest and not passthrough:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+    args.func(args, rest)
+
+if __name__ == "__main__":
+    main()